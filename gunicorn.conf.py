@@ -0,0 +1,27 @@
+"""
+gunicorn settings tuned for cold starts.
+
+The app is imported and warmed up once in the master and then forked, so the
+workers share it instead of each importing Django on a cold machine, and can
+answer as soon as they start. Database connections must not cross the fork,
+so the master skips them and every worker connects after it is forked. That
+only pays off with a pool or persistent connections (DATABASE_POOL or
+DATABASE_CONN_MAX_AGE); otherwise startup.connect() leaves them alone.
+"""
+
+import os
+
+os.environ.setdefault('HABITS_WARMUP_DATABASES', 'false')
+
+bind = ':8000'
+workers = 2
+preload_app = True
+
+
+def post_fork(server, worker):
+    from django.conf import settings
+
+    if settings.HABITS_WARMUP:
+        from habits import startup
+
+        startup.connect()
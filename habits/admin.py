@@ -1,7 +1,172 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-from . import models
+from . import fragments, models
 
+# Below this many rows an exact count is cheap enough.
+ESTIMATE_THRESHOLD = 100_000
 
-admin.site.register(models.Habit)
-admin.site.register(models.Completion)
+
+def estimated_count(model, using):
+    """
+    Return Postgres' estimate of the number of rows in model's table from
+    the planner statistics, or None where there is no estimate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # A table that has never been vacuumed or analyzed has reltuples -1.
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that counts an unfiltered changelist of a large table from
+    the planner statistics instead of a COUNT(*) over every row.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class RelatedIdFilter(admin.SimpleListFilter):
+    """
+    Filter on the id of a related object given in the query string. Only the
+    selected object is listed, rather than every candidate, so the sidebar
+    doesn't query the whole related table; the changelists link to filtered
+    views instead.
+    """
+    field_path = None
+    related_model = None
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if value and value.isdigit():
+            related = self.related_model._default_manager.filter(pk=value).first()
+            if related is not None:
+                return [(value, str(related))]
+        return []
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_path: self.value()})
+        return queryset
+
+
+class UserFilter(RelatedIdFilter):
+    title = 'user'
+    parameter_name = 'user'
+    field_path = 'user'
+    related_model = get_user_model()
+
+
+class CompletionUserFilter(UserFilter):
+    field_path = 'habit__user'
+
+
+class CompletionHabitFilter(RelatedIdFilter):
+    title = 'habit'
+    parameter_name = 'habit'
+    field_path = 'habit'
+    related_model = models.Habit
+
+
+@admin.register(models.Habit)
+class HabitAdmin(admin.ModelAdmin):
+    list_display = [
+        'name', 'user_link', 'is_bad', 'date_created',
+        'completions', 'current_streak',
+    ]
+    list_select_related = ['user', 'summary']
+    list_filter = ['is_bad', UserFilter]
+    search_fields = ['name']
+    raw_id_fields = ['user']
+    date_hierarchy = 'date_created'
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_completion_count()
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        # Streaks come from the summaries; compute any that are missing in
+        # bulk, without saving them from a read.
+        models.HabitSummary.objects.build([
+            habit for habit in changelist.result_list if not habit._loaded_summary
+        ])
+        return changelist
+
+    @admin.display(description='user', ordering='user')
+    def user_link(self, habit):
+        return format_html(
+            '<a href="?user={}">{}</a>', habit.user_id, habit.user,
+        )
+
+    @admin.display()
+    def completions(self, habit):
+        count = getattr(habit, 'completion_count', None)
+        if count is None:
+            return count
+        return format_html(
+            '<a href="{}?habit={}">{}</a>',
+            reverse('admin:habits_completion_changelist'),
+            habit.pk,
+            count,
+        )
+
+    @admin.display()
+    def current_streak(self, habit):
+        return habit.current_streak
+
+
+@admin.register(models.Completion)
+class CompletionAdmin(admin.ModelAdmin):
+    list_display = ['habit', 'date']
+    list_select_related = ['habit']
+    list_filter = [CompletionUserFilter, CompletionHabitFilter]
+    raw_id_fields = ['habit']
+    date_hierarchy = 'date'
+    # Newest first by primary key, which unlike the date is indexed.
+    ordering = ['-pk']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        previous = form.initial.get('habit') if change else None
+        super().save_model(request, obj, form, change)
+        self.refresh_habits({obj.habit_id, previous} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.refresh_habits({obj.habit_id})
+
+    def delete_queryset(self, request, queryset):
+        habit_ids = set(queryset.values_list('habit_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.refresh_habits(habit_ids)
+
+    def refresh_habits(self, habit_ids):
+        """
+        Rebuild the summaries and cached rows of the habits whose completions
+        were edited here, bypassing Habit.complete and Habit.uncomplete.
+        """
+        models.HabitSummary.objects.rebuild(models.Habit.objects.filter(pk__in=habit_ids))
+        for habit_id in habit_ids:
+            fragments.bump_version(habit_id)
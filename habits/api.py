@@ -0,0 +1,273 @@
+"""
+JSON API over the signed in user's habits.
+
+Lists are keyset paginated by id, and ``fields`` selects a subset of FIELDS;
+stats are only loaded when a stats field is asked for. Every completion change
+and habit edit updates the habit's summary, so responses carry an ETag and
+Last-Modified derived from the latest summary update, letting polling clients
+revalidate with a single aggregate query and get a 304 until something
+changes. Reads never save summaries: habits without one are summarized per
+request, and their responses carry no validators until a write or
+rebuild_habit_summaries saves one.
+
+The only write endpoint is sync, which applies a batch of explicit set and
+unset operations queued by an offline client.
+"""
+
+import datetime
+import hashlib
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
+from django.views import View
+from django.views.decorators.http import condition
+
+from . import fragments, imports
+from .models import Habit, HabitSummary, completions
+
+MODEL_FIELDS = ['id', 'name', 'is_bad', 'date_created']
+STREAK_FIELDS = ['current_streak', 'longest_streak', 'completed_today']
+PERIOD_FIELDS = [f'{period}_completions' for period, _ in reversed(Habit.periods)]
+FIELDS = MODEL_FIELDS + STREAK_FIELDS + PERIOD_FIELDS
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+MAX_OPERATIONS = 5000
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+def parse_fields(request):
+    value = request.GET.get('fields')
+    if not value:
+        return FIELDS
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise InvalidParameter(f'Unknown fields: {", ".join(unknown)}.')
+    return fields
+
+
+def parse_int(request, name, default, maximum=None):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        raise InvalidParameter(f'{name} must be an integer.')
+    if value < 0 or (maximum is not None and not 0 < value <= maximum):
+        raise InvalidParameter(f'{name} is out of range.')
+    return value
+
+
+def load(habits, fields):
+    """Evaluate habits, loading only what the requested fields need."""
+    if not set(fields) & set(STREAK_FIELDS + PERIOD_FIELDS):
+        # habit_set reads user_id to attach the already loaded user.
+        return list(habits.only('user', *MODEL_FIELDS[1:]))
+    habits = habits.with_summary()
+    if set(fields) & set(PERIOD_FIELDS):
+        habits = habits.with_period_counts()
+    habits = list(habits)
+    HabitSummary.objects.build(
+        [habit for habit in habits if habit._loaded_summary is None]
+    )
+    return habits
+
+
+def serialize(habit, fields):
+    periods = {}
+    if set(fields) & set(PERIOD_FIELDS):
+        periods = {
+            f'{period}_completions': stats['completions']
+            for period, stats in habit.period_stats().items()
+        }
+    data = {}
+    for field in fields:
+        if field == 'id':
+            data[field] = habit.pk
+        elif field == 'date_created':
+            data[field] = habit.date_created.isoformat()
+        elif field in PERIOD_FIELDS:
+            data[field] = periods[field]
+        else:
+            data[field] = getattr(habit, field)
+    return data
+
+
+def _state(request, pk=None):
+    """
+    Aggregate what the response depends on, once per request: the number of
+    habits, their latest id, how many have no summary yet and the latest
+    summary update.
+    """
+    if not hasattr(request, '_habits_api_state'):
+        habits = request.user.habit_set.all()
+        if pk is not None:
+            habits = habits.filter(pk=pk)
+        request._habits_api_state = habits.aggregate(
+            count=Count('pk'),
+            last_pk=Max('pk'),
+            unsummarized=Count('pk', filter=Q(summary__isnull=True)),
+            updated=Max('summary__updated'),
+        )
+    return request._habits_api_state
+
+
+def last_modified(request, pk=None):
+    state = _state(request, pk)
+    if state['unsummarized']:
+        # Building the missing summaries will change the response.
+        return None
+    # Streaks are relative to today, so nothing is older than midnight.
+    midnight = timezone.make_aware(
+        datetime.datetime.combine(timezone.localdate(), datetime.time())
+    )
+    return max(state['updated'] or midnight, midnight)
+
+
+def etag(request, pk=None):
+    state = _state(request, pk)
+    if state['unsummarized']:
+        return None
+    key = ':'.join(map(str, [
+        request.user.pk,
+        request.get_full_path(),
+        timezone.localdate(),
+        *state.values(),
+    ]))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+class APIView(LoginRequiredMixin, View):
+    raise_exception = True
+
+    @method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
+    def get(self, request, *args, **kwargs):
+        try:
+            response = JsonResponse(self.get_data(request, *args, **kwargs))
+        except InvalidParameter as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        except Habit.DoesNotExist:
+            return JsonResponse({'error': 'Not found.'}, status=404)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class HabitListAPIView(APIView):
+    def get_data(self, request):
+        fields = parse_fields(request)
+        after = parse_int(request, 'after', 0)
+        limit = parse_int(request, 'limit', DEFAULT_LIMIT, MAX_LIMIT)
+        habits = load(
+            request.user.habit_set.filter(pk__gt=after).order_by('pk')[:limit + 1],
+            fields,
+        )
+        next_url = None
+        if len(habits) > limit:
+            habits = habits[:limit]
+            query = {**request.GET.dict(), 'after': habits[-1].pk}
+            next_url = f'{reverse("api_habit_list")}?{urlencode(query)}'
+        return {
+            'results': [serialize(habit, fields) for habit in habits],
+            'next': next_url,
+        }
+
+
+class HabitDetailAPIView(APIView):
+    def get_data(self, request, pk):
+        fields = parse_fields(request)
+        habits = load(request.user.habit_set.filter(pk=pk), fields)
+        if not habits:
+            raise Habit.DoesNotExist
+        return serialize(habits[0], fields)
+
+
+def parse_operations(body):
+    """
+    Return the final completed state of every (habit id, date) pair in a
+    sync request body, later operations on a pair overriding earlier ones.
+    """
+    try:
+        operations = json.loads(body)['operations']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidParameter('Expected a JSON object with a list of operations.')
+    if not isinstance(operations, list) or len(operations) > MAX_OPERATIONS:
+        raise InvalidParameter(f'operations must be a list of at most {MAX_OPERATIONS}.')
+    today = timezone.localdate()
+    states = {}
+    for index, operation in enumerate(operations):
+        try:
+            habit_id, date, completed = (
+                operation['habit'], operation['date'], operation['completed'],
+            )
+            if type(habit_id) is not int or not isinstance(completed, bool):
+                raise TypeError
+            date = imports.parse_date(date)
+        except (KeyError, TypeError, ValueError):
+            raise InvalidParameter(
+                f'Operation {index} must have an integer habit, a YYYY-MM-DD '
+                'date and a boolean completed.'
+            )
+        if date > today:
+            raise InvalidParameter(f'Operation {index} is for {date}, which is in the future.')
+        states[habit_id, date] = completed
+    return states
+
+
+class SyncAPIView(LoginRequiredMixin, View):
+    """
+    Apply {"habit": id, "date": "YYYY-MM-DD", "completed": bool} operations
+    in one transaction with one bulk insert and one delete, and return the
+    resulting streaks of every affected habit. Operations say what the state
+    should be rather than flipping it, so replaying a batch is harmless.
+    """
+    raise_exception = True
+
+    def post(self, request):
+        try:
+            states = parse_operations(request.body)
+        except InvalidParameter as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        habit_ids = {habit_id for habit_id, _ in states}
+        with transaction.atomic():
+            habits = list(
+                request.user.habit_set.select_for_update().filter(
+                    pk__in=habit_ids,
+                ).order_by('pk')
+            )
+            unknown = habit_ids - {habit.pk for habit in habits}
+            if unknown:
+                return JsonResponse(
+                    {'error': f'Unknown habits: {", ".join(map(str, sorted(unknown)))}.'},
+                    status=400,
+                )
+            sets, unsets = {}, {}
+            for (habit_id, date), completed in states.items():
+                days = sets if completed else unsets
+                days.setdefault(habit_id, set()).add(date.toordinal())
+            completions().add_days(sets)
+            completions().remove_days(unsets)
+            HabitSummary.objects.rebuild(habits)
+        for habit in habits:
+            fragments.bump_version(habit.pk)
+        states_by_habit = {}
+        for (habit_id, date), completed in sorted(states.items()):
+            states_by_habit.setdefault(habit_id, {})[str(date)] = completed
+        return JsonResponse({
+            'habits': [
+                {
+                    **serialize(habit, ['id', *STREAK_FIELDS]),
+                    'completions': states_by_habit[habit.pk],
+                }
+                for habit in habits
+            ],
+        })
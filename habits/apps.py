@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class HabitsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'habits'
+
+    def ready(self):
+        from . import pooling, profiling, timing
+
+        connection_created.connect(timing.install)
+        connection_created.connect(profiling.install)
+        connection_created.connect(pooling.record)
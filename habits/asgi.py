@@ -10,9 +10,15 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 import os
 
 import dotenv
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 dotenv.load_dotenv()
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habits.settings')
 
 application = get_asgi_application()
+
+if settings.HABITS_WARMUP:
+    from habits import startup
+
+    startup.warmup(databases=settings.HABITS_WARMUP_DATABASES)
@@ -0,0 +1,138 @@
+"""
+Synthetic data and timing helpers shared by the benchmark commands.
+"""
+
+import contextlib
+import datetime
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.utils import timezone
+
+from .models import Habit, completions
+
+
+def seed(users=1, habits=100, years=3, density=0.7, gaps=0, gap_length=7, seed=0):
+    """
+    Create users each owning habits created years ago, completed on each day
+    with probability density except during gaps, a number of runs of
+    gap_length missed days per habit and year. Return the users.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    start = today - datetime.timedelta(days=365 * years)
+    total = 365 * years + 1
+    created_users = get_user_model().objects.bulk_create(
+        get_user_model()(email=f'bench-{seed}-{i}@example.com')
+        for i in range(users)
+    )
+    created = Habit.objects.bulk_create(
+        Habit(user=user, name=f'bench-{seed}-{user.pk}-{i}', is_bad=i % 4 == 0)
+        for user in created_users
+        for i in range(habits)
+    )
+    Habit.objects.filter(pk__in=[habit.pk for habit in created]).update(
+        date_created=start,
+    )
+    days_by_habit = {}
+    for habit in created:
+        missed = set()
+        for _ in range(gaps * years):
+            first = rng.randrange(total)
+            missed.update(range(first, first + gap_length))
+        days_by_habit[habit.pk] = [
+            start.toordinal() + day
+            for day in range(total)
+            if day not in missed and rng.random() < density
+        ]
+    completions().create_from_days(days_by_habit)
+    return created_users
+
+
+def summarize(timings):
+    """Return the median, percentiles and extremes of timings in ms."""
+    timings = sorted(timing * 1000 for timing in timings)
+    return {
+        'samples': len(timings),
+        'median_ms': round(statistics.median(timings), 4),
+        'p90_ms': round(percentile(timings, 90), 4),
+        'p95_ms': round(percentile(timings, 95), 4),
+        'p99_ms': round(percentile(timings, 99), 4),
+        'min_ms': round(timings[0], 4),
+        'max_ms': round(timings[-1], 4),
+    }
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    return values[max(math.ceil(len(values) * p / 100) - 1, 0)]
+
+
+# Sent as both the cookie and the header, so POSTs pass the CSRF check.
+CSRF_TOKEN = 'bench' * 6 + 'ab'
+
+
+def session_cookie(user):
+    """Return a Cookie header signing in user, with the CSRF_TOKEN cookie."""
+    client = Client()
+    client.force_login(user)
+    return (
+        f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}; '
+        f'{settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}'
+    )
+
+
+@contextlib.contextmanager
+def serve(argv, port, env=None, timeout=30):
+    """Run a server process until the block exits, once it accepts connections."""
+    process = subprocess.Popen(argv, env={**os.environ, **(env or {})})
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'{argv[0]} exited with {process.returncode}.')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'Nothing listening on port {port}.')
+                time.sleep(0.1)
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout)
+
+
+def tree_rss(pid):
+    """Resident memory in bytes of a process and its descendants (Linux)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The parent id follows the parenthesized command name.
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        pids.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            pass
+    return total
@@ -0,0 +1,40 @@
+"""
+Packing of completion dates into per-year bitmaps.
+
+A year of completions is 366 bits, one per day of the year, split across
+six integer words of 61 bits each so every word fits in a signed 64-bit
+database column and can be manipulated with plain bitwise SQL operators.
+"""
+
+import datetime
+
+WORDS = 6
+BITS_PER_WORD = 61
+
+
+def locate(date):
+    """Return the (year, word index, bit mask) that stores date."""
+    index = date.timetuple().tm_yday - 1
+    return date.year, index // BITS_PER_WORD, 1 << index % BITS_PER_WORD
+
+
+def pack(days):
+    """Pack sorted day ordinals into a {year: [word, ...]} mapping."""
+    years = {}
+    for day in days:
+        year, word, mask = locate(datetime.date.fromordinal(day))
+        years.setdefault(year, [0] * WORDS)[word] |= mask
+    return years
+
+
+def unpack(year, words):
+    """Return the sorted day ordinals set in a year's words."""
+    start = datetime.date(year, 1, 1).toordinal()
+    days = []
+    for index, word in enumerate(words):
+        offset = start + index * BITS_PER_WORD
+        while word:
+            lowest = word & -word
+            days.append(offset + lowest.bit_length() - 1)
+            word ^= lowest
+    return days
@@ -0,0 +1,74 @@
+"""
+Layout of a habit's year of completions as a contribution-style calendar.
+"""
+
+import calendar
+import datetime
+
+
+def year_grid(year, days, today):
+    """
+    Lay out year as seven weekday rows of week columns, Sunday first, with
+    one cell per day holding its date and whether it was completed or is
+    still to come, and None for the days of the neighbouring years that pad
+    the first and last weeks. Also count the completions of each month and
+    label the week each month starts in.
+    """
+    days = set(days)
+    first = datetime.date(year, 1, 1)
+    start = first - datetime.timedelta(days=(first.weekday() + 1) % 7)
+    last = datetime.date(year, 12, 31)
+    weeks = (last - start).days // 7 + 1
+    rows = [[None] * weeks for _ in range(7)]
+    months = [
+        {'name': calendar.month_abbr[month], 'completions': 0, 'week': None}
+        for month in range(1, 13)
+    ]
+    for offset in range((last - start).days + 1):
+        date = start + datetime.timedelta(days=offset)
+        if date.year != year:
+            continue
+        week, weekday = divmod(offset, 7)
+        completed = date.toordinal() in days
+        rows[weekday][week] = {
+            'date': date,
+            'completed': completed,
+            'future': date > today,
+        }
+        month = months[date.month - 1]
+        month['completions'] += completed
+        if month['week'] is None:
+            month['week'] = week
+    labels = [''] * weeks
+    for month in months:
+        labels[month['week']] = month['name']
+    return {
+        'year': year,
+        'rows': [
+            {'label': calendar.day_abbr[(weekday + 6) % 7], 'cells': cells}
+            for weekday, cells in enumerate(rows)
+        ],
+        'labels': labels,
+        'months': months,
+        'completions': len(days),
+    }
+
+
+def week_grid(habits, days_by_habit, end):
+    """
+    Lay out the seven days up to end as columns and habits as rows, with
+    one cell per habit and day holding its date and whether it was
+    completed.
+    """
+    dates = [end - datetime.timedelta(days=offset) for offset in range(6, -1, -1)]
+    rows = []
+    for habit in habits:
+        days = set(days_by_habit.get(habit.pk, ()))
+        rows.append({
+            'habit': habit,
+            'cells': [
+                {'date': date, 'completed': date.toordinal() in days}
+                for date in dates
+            ],
+        })
+    return {'dates': dates, 'rows': rows}
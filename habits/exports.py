@@ -0,0 +1,93 @@
+"""
+Streaming export of a user's habits and completions as CSV or JSON lines.
+
+There is one row per completion, or a single row without a date for a habit
+that has none, each carrying the habit's stats as of the export. Completions
+are read in chunks ordered by habit and written out one row at a time, so
+memory use doesn't grow with the length of the history.
+"""
+
+import csv
+import datetime
+import itertools
+import json
+
+from .models import HabitSummary, completions
+
+FIELDS = [
+    'habit_id',
+    'habit',
+    'is_bad',
+    'date_created',
+    'current_streak',
+    'longest_streak',
+    'year_completions',
+    'month_completions',
+    'week_completions',
+    'date',
+]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def rows(user):
+    habits = list(user.habit_set.with_summary().with_period_counts().order_by('pk'))
+    HabitSummary.objects.build(
+        [habit for habit in habits if habit._loaded_summary is None]
+    )
+    days = completions().iter_days(user.habit_set.all())
+    groups = itertools.groupby(days, key=lambda pair: pair[0])
+    group = next(groups, None)
+    for habit in habits:
+        row = _habit_row(habit)
+        # Skip completions of habits created since the habits were read.
+        while group is not None and group[0] < habit.pk:
+            group = next(groups, None)
+        if group is None or group[0] != habit.pk:
+            yield {**row, 'date': None}
+            continue
+        for _, day in group[1]:
+            yield {**row, 'date': datetime.date.fromordinal(day).isoformat()}
+        group = next(groups, None)
+
+
+def _habit_row(habit):
+    summary = habit.summary
+    return {
+        'habit_id': habit.pk,
+        'habit': habit.name,
+        'is_bad': habit.is_bad,
+        'date_created': habit.date_created.isoformat(),
+        'current_streak': summary.current_streak,
+        'longest_streak': summary.longest_streak,
+        **{
+            f'{period}_completions': stats['completions']
+            for period, stats in habit.period_stats().items()
+        },
+    }
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(_Echo(), FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+def export(user, format):
+    """Return an iterator over the lines of user's export in format."""
+    lines = csv_lines if format == 'csv' else jsonl_lines
+    return lines(rows(user))
@@ -0,0 +1,115 @@
+"""
+Database expressions computing streaks from Completion rows.
+
+Streaks are found with the gaps-and-islands technique: numbering a habit's
+completion days in order and subtracting that row number from the day number
+gives the same value for every day of a run. Days are compared as ordinals
+matching ``date.toordinal()``, so the results line up with ``habits.streaks``.
+"""
+
+from django.db import NotSupportedError, models
+
+DAY_NUMBERS = {
+    'postgresql': "({} - DATE '0001-01-01' + 1)",
+    'sqlite': 'CAST(julianday({}) - 1721424.5 AS INTEGER)',
+}
+
+
+class StreakExpression(models.Func):
+    """
+    A correlated subquery over the outer habit's completions, choosing the
+    good or bad habit variant of its SQL by the habit's is_bad column.
+    """
+    output_field = models.IntegerField()
+    good_sql = bad_sql = None
+
+    def __init__(self, today, **extra):
+        super().__init__(
+            models.F('pk'),
+            models.F('date_created'),
+            models.F('is_bad'),
+            **extra,
+        )
+        self.today = today
+
+    def as_sql(self, compiler, connection, **extra_context):
+        from .models import Completion
+
+        if connection.vendor not in DAY_NUMBERS:
+            raise NotSupportedError(
+                f'Streak annotations are not supported on {connection.vendor}.'
+            )
+        day_number = DAY_NUMBERS[connection.vendor]
+        # The outer columns compile to plain column references without
+        # params, so they can be repeated freely in the SQL below.
+        habit, created, is_bad = (
+            compiler.compile(expression)[0]
+            for expression in self.get_source_expressions()
+        )
+        table = connection.ops.quote_name(Completion._meta.db_table)
+        days = (
+            f'SELECT {day_number.format(f"{table}.date")} AS day '
+            f'FROM {table} WHERE {table}.habit_id = {habit} '
+            f"AND {table}.date {{}} '{self.today.isoformat()}'"
+        )
+        context = {
+            'days': days.format('<='),
+            'past': days.format('<'),
+            'yesterday': self.today.toordinal() - 1,
+            'created': day_number.format(created),
+        }
+        sql = (
+            f'CASE WHEN {is_bad} THEN ({self.bad_sql.format(**context)}) '
+            f'ELSE ({self.good_sql.format(**context)}) END'
+        )
+        return sql, ()
+
+
+RUNS = '''
+    SELECT MIN(day) AS run_start, MAX(day) AS run_end
+    FROM (
+        SELECT day, day - ROW_NUMBER() OVER (ORDER BY day) AS island
+        FROM ({days}) days
+    ) islands
+    GROUP BY island
+'''
+
+
+class CurrentStreak(StreakExpression):
+    good_sql = f'''
+        SELECT COALESCE(MAX(
+            CASE WHEN run_end >= {{yesterday}} THEN run_end - run_start + 1 END
+        ), 0)
+        FROM ({RUNS}) runs
+    '''
+    bad_sql = '''
+        SELECT CASE
+            WHEN MAX(day) >= {yesterday} THEN 0
+            WHEN MAX(day) IS NOT NULL THEN {yesterday} - MAX(day)
+            WHEN {yesterday} - {created} > 1 THEN {yesterday} - {created}
+            ELSE 0
+        END
+        FROM ({days}) days
+    '''
+
+
+class LongestStreak(StreakExpression):
+    good_sql = f'''
+        SELECT COALESCE(MAX(run_end - run_start + 1), 0)
+        FROM ({RUNS}) runs
+    '''
+    bad_sql = '''
+        SELECT MAX(gap) FROM (
+            SELECT day - LAG(day) OVER (ORDER BY day) - 1 AS gap
+            FROM ({past}) days
+            UNION ALL
+            SELECT {yesterday} - MAX(day) FROM ({past}) days
+            UNION ALL
+            SELECT CASE
+                WHEN COALESCE(MIN(day), {yesterday}) - {created} > 1
+                THEN COALESCE(MIN(day), {yesterday}) - {created}
+                ELSE 0
+            END
+            FROM ({past}) days
+        ) gaps
+    '''
@@ -1,7 +1,7 @@
 from django import forms
 from django.urls import reverse_lazy
 
-from . import models
+from . import imports, models
 
 
 class DateForm(forms.Form):
@@ -33,3 +33,10 @@ class HabitForm(forms.ModelForm):
     class Meta:
         model = models.Habit
         fields = ['name', 'is_bad']
+
+
+class ImportForm(forms.Form):
+    file = forms.FileField()
+    format = forms.ChoiceField(
+        choices=[(format, format.upper()) for format in imports.FORMATS],
+    )
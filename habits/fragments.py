@@ -0,0 +1,129 @@
+"""
+Cache of rendered habit list rows and year calendars.
+
+A row only changes when the habit or its completions change, or when the day
+rolls over, so rows are cached under a key made of the user, habit, viewed
+date, current local day and a per-habit version that ``bump_version``
+invalidates. Versions live in the cache too, so every process sharing the
+cache sees the same ones. Year calendars use the same versions, and only the
+current year's also depends on the day.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from . import calendars
+
+TEMPLATE = 'habits/partials/_habit.html'
+YEAR_TEMPLATE = 'habits/partials/_year.html'
+TIMEOUT = 60 * 60 * 24
+COUNTER_KEYS = {
+    'hits': 'habits:rows:hits',
+    'misses': 'habits:rows:misses',
+}
+
+
+def _version_key(habit_id):
+    return f'habits:habit:{habit_id}:version'
+
+
+def bump_version(habit_id):
+    """
+    Invalidate the habit's cached rows once the current transaction commits.
+    Bumping earlier would let a concurrent request render the uncommitted
+    state and cache it under the new version.
+    """
+    transaction.on_commit(lambda: _bump_version(habit_id))
+
+
+def _bump_version(habit_id):
+    # Not incr(), which some backends, such as the database cache, implement
+    # as a read and a write, so that two concurrent bumps could both land on
+    # the same version. A fresh version must also never match one used
+    # before the key was evicted.
+    cache.set(_version_key(habit_id), time.time_ns(), None)
+
+
+def get_versions(habit_ids):
+    keys = {_version_key(habit_id): habit_id for habit_id in habit_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    missing = {
+        key: time.time_ns()
+        for key, habit_id in keys.items()
+        if habit_id not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update((keys[key], version) for key, version in missing.items())
+    return versions
+
+
+def render_rows(user, habits, date):
+    """
+    Set ``rendered_row`` on every habit, rendering only the rows missing
+    from the cache, and return the number of (hits, misses).
+    """
+    today = timezone.localdate()
+    versions = get_versions([habit.pk for habit in habits])
+    keys = {
+        habit.pk: f'habits:row:{user.pk}:{habit.pk}:{date}:{today}:{versions[habit.pk]}'
+        for habit in habits
+    }
+    cached = cache.get_many(keys.values())
+    rendered = {}
+    for habit in habits:
+        row = cached.get(keys[habit.pk])
+        if row is None:
+            row = render_to_string(TEMPLATE, {'habit': habit, 'date': date})
+            rendered[keys[habit.pk]] = row
+        habit.rendered_row = mark_safe(row)
+    if rendered:
+        cache.set_many(rendered, TIMEOUT)
+    hits, misses = len(habits) - len(rendered), len(rendered)
+    _count('hits', hits)
+    _count('misses', misses)
+    return hits, misses
+
+
+def render_year(habit, year):
+    """Return the rendered calendar of habit's completions in year."""
+    today = timezone.localdate()
+    version = get_versions([habit.pk])[habit.pk]
+    day = today if year == today.year else None
+    key = f'habits:year:{habit.pk}:{year}:{day}:{version}'
+    html = cache.get(key)
+    if html is None:
+        from .models import completions
+
+        grid = calendars.year_grid(year, completions().year_days(habit, year), today)
+        html = render_to_string(YEAR_TEMPLATE, {'habit': habit, **grid})
+        cache.set(key, html, TIMEOUT)
+    return mark_safe(html)
+
+
+def _count(counter, n):
+    if not n:
+        return
+    key = COUNTER_KEYS[counter]
+    try:
+        cache.incr(key, n)
+    except ValueError:
+        if not cache.add(key, n, None):
+            cache.incr(key, n)
+
+
+def counters():
+    values = cache.get_many(COUNTER_KEYS.values())
+    return {
+        counter: values.get(key, 0)
+        for counter, key in COUNTER_KEYS.items()
+    }
+
+
+def reset_counters():
+    cache.delete_many(COUNTER_KEYS.values())
@@ -0,0 +1,150 @@
+"""
+Bulk import of completion history from CSV or JSON lines.
+
+Every row names a habit and a date in the YYYY-MM-DD format of completion
+URLs. Other columns, such as those of an export, are ignored, except that
+is_bad is used for habits that don't exist yet. Input is read as a stream and
+written in batches, each in its own transaction, and the summaries and
+rendered rows of the imported habits are refreshed once per habit at the end.
+"""
+
+import csv
+import json
+import re
+import time
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import fragments
+from .converters import DateConverter
+from .models import Habit, HabitSummary, completions
+
+FORMATS = ['csv', 'jsonl']
+MAX_ERRORS = 100
+
+
+def read_rows(lines, format):
+    """Yield (line number, row) pairs, with a row of None if undecodable."""
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def parse_date(value):
+    if not isinstance(value, str) or not re.fullmatch(DateConverter.regex, value):
+        raise ValueError(f'Invalid date {value!r}, expected YYYY-MM-DD.')
+    try:
+        return DateConverter().to_python(value)
+    except ValueError:
+        raise ValueError(f'Invalid date {value!r}.')
+
+
+def parse_bool(value):
+    return str(value).lower() in ('true', '1', 'yes', 'on')
+
+
+def import_completions(user, lines, format, batch_size=5000):
+    """
+    Import user's completions from lines of CSV or JSON lines, creating
+    missing habits, and return a report of what was imported.
+    """
+    started = time.perf_counter()
+    today = timezone.localdate()
+    habits = {habit.name: habit for habit in user.habit_set.all()}
+    unavailable = set()
+    imported = {}
+    batch = {}
+    pending = 0
+    report = {
+        'rows': 0,
+        'completions': 0,
+        'imported': 0,
+        'invalid': 0,
+        'errors': [],
+    }
+
+    def fail(line, message):
+        report['invalid'] += 1
+        if len(report['errors']) < MAX_ERRORS:
+            report['errors'].append((line, message))
+
+    def flush():
+        with transaction.atomic():
+            report['imported'] += completions().add_days(batch)
+        batch.clear()
+
+    for line, row in read_rows(lines, format):
+        report['rows'] += 1
+        if row is None:
+            fail(line, 'Not a JSON object.')
+            continue
+        name = row.get('habit') or ''
+        if not isinstance(name, str):
+            fail(line, f'Invalid habit name {name!r}.')
+            continue
+        name = name.strip()
+        if not name:
+            fail(line, 'Missing habit name.')
+            continue
+        date = row.get('date') or None
+        if date is not None:
+            try:
+                date = parse_date(date)
+            except ValueError as error:
+                fail(line, str(error))
+                continue
+            if date > today:
+                fail(line, f'Date {date} is in the future.')
+                continue
+        habit = habits.get(name)
+        if habit is None and name not in unavailable:
+            try:
+                with transaction.atomic():
+                    habit = Habit.objects.create(
+                        user=user,
+                        name=name,
+                        is_bad=parse_bool(row.get('is_bad')),
+                    )
+                habits[name] = habit
+            except IntegrityError:
+                unavailable.add(name)
+        if habit is None:
+            fail(line, f'The habit name {name!r} is taken.')
+            continue
+        imported[habit.pk] = habit
+        if date is None:
+            continue
+        report['completions'] += 1
+        batch.setdefault(habit.pk, set()).add(date.toordinal())
+        pending += 1
+        if pending >= batch_size:
+            flush()
+            pending = 0
+    if batch:
+        flush()
+
+    habits = list(imported.values())
+    for start in range(0, len(habits), 500):
+        HabitSummary.objects.rebuild(habits[start:start + 500], today)
+    for habit in habits:
+        fragments.bump_version(habit.pk)
+
+    seconds = time.perf_counter() - started
+    report.update(
+        habits=len(habits),
+        duplicates=report['completions'] - report['imported'],
+        seconds=round(seconds, 3),
+        rows_per_second=round(report['rows'] / seconds) if seconds else None,
+    )
+    return report
@@ -0,0 +1,42 @@
+from . import bench_servers
+
+CONNECTIONS = {
+    'per-request': {
+        'DATABASE_CONN_MAX_AGE': '0',
+        'DATABASE_POOL': 'false',
+    },
+    'persistent': {
+        'DATABASE_CONN_MAX_AGE': '600',
+        'DATABASE_CONN_HEALTH_CHECKS': 'true',
+        'DATABASE_POOL': 'false',
+    },
+    'pool': {
+        'DATABASE_CONN_MAX_AGE': '0',
+        'DATABASE_CONN_HEALTH_CHECKS': 'true',
+        'DATABASE_POOL': 'true',
+    },
+}
+
+
+class Command(bench_servers.Command):
+    help = (
+        'Compare request latency and throughput of the app with a database '
+        'connection per request, persistent connections and a connection '
+        'pool, under each server. Seeded data is deleted afterwards.'
+    )
+    config_keys = bench_servers.Command.config_keys + ['connections']
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(modes=['wsgi'])
+        parser.add_argument(
+            '--connections',
+            nargs='+',
+            choices=list(CONNECTIONS),
+            default=list(CONNECTIONS),
+        )
+
+    def configurations(self, modes, connections, **options):
+        for mode in modes:
+            for name in connections:
+                yield f'{mode}/{name}', mode, CONNECTIONS[name]
@@ -0,0 +1,148 @@
+import json
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from habits import benchmarks
+from habits.models import Habit, HabitSummary
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the habit hot paths on a synthetic dataset and print the '
+        'results as JSON. Nothing is left in the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--habits', type=int, default=20, help='Habits per user.')
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument(
+            '--density',
+            type=float,
+            default=0.7,
+            help='Probability of a completion on any day outside a gap.',
+        )
+        parser.add_argument(
+            '--gaps',
+            type=int,
+            default=2,
+            help='Runs of missed days per habit and year.',
+        )
+        parser.add_argument('--gap-length', type=int, default=7)
+        parser.add_argument(
+            '--summaries',
+            action='store_true',
+            help='Build habit summaries before timing.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON here instead of stdout.')
+
+    def handle(self, *args, output, **options):
+        with transaction.atomic():
+            users = benchmarks.seed(
+                users=options['users'],
+                habits=options['habits'],
+                years=options['years'],
+                density=options['density'],
+                gaps=options['gaps'],
+                gap_length=options['gap_length'],
+                seed=options['seed'],
+            )
+            habits = Habit.objects.filter(user__in=users)
+            if options['summaries']:
+                HabitSummary.objects.rebuild(habits)
+            results = self.run(users, habits, options['repeat'])
+            transaction.set_rollback(True)
+        report = json.dumps(
+            {
+                'config': {
+                    **{
+                        key: options[key]
+                        for key in (
+                            'users', 'habits', 'years', 'density', 'gaps',
+                            'gap_length', 'summaries', 'repeat', 'seed',
+                        )
+                    },
+                    'vendor': connection.vendor,
+                    'storage': settings.HABITS_COMPLETION_STORAGE,
+                },
+                'results': results,
+            },
+            indent=2,
+        )
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def run(self, users, habits, repeat):
+        today = timezone.localdate()
+
+        def prefetched():
+            return list(habits.prefetch_related('completion_set', 'completionyear_set'))
+
+        def listed():
+            return list(habits.with_completion_status(today))
+
+        return {
+            'Habit.stats': self.bench(
+                prefetched, lambda habit: habit.stats, repeat,
+            ),
+            'Habit.quick_stats': self.bench(
+                prefetched, lambda habit: habit.quick_stats, repeat,
+            ),
+            'with_completion_status': self.bench(
+                lambda: users,
+                lambda user: list(
+                    Habit.objects.filter(user=user).with_completion_status(today)
+                ),
+                repeat,
+            ),
+            'streak_text': self.bench(
+                listed, lambda habit: habit.streak_text(), repeat,
+            ),
+            'render _habit.html': self.bench(
+                listed,
+                lambda habit: render_to_string(
+                    'habits/partials/_habit.html',
+                    {'habit': habit, 'date': today},
+                ),
+                repeat,
+            ),
+        }
+
+    def bench(self, setup, func, repeat):
+        """
+        Time func on every item returned by setup, repeat times over fresh
+        items, then once more counting queries and peak memory, which would
+        otherwise skew the timings.
+        """
+        timings = []
+        for _ in range(repeat):
+            for item in setup():
+                started = time.perf_counter()
+                func(item)
+                timings.append(time.perf_counter() - started)
+        items = setup()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                for item in items:
+                    func(item)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            **benchmarks.summarize(timings),
+            'queries_per_call': round(len(queries) / len(items), 2),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
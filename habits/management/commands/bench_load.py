@@ -0,0 +1,192 @@
+import concurrent.futures
+import io
+import json
+import random
+import sys
+import time
+import urllib.parse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.urls import reverse
+from django.utils import timezone
+
+from habits import benchmarks
+from habits.models import Habit, HabitSummary
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the WSGI app in this process with concurrent simulated users, '
+        'each repeatedly listing their habits, paging through dates, opening '
+        'and toggling habits and now and then adding one, and print the '
+        'throughput, latency percentiles and queries per request of each URL '
+        'as JSON. Each user signs in as their own seeded user; seeded data is '
+        'deleted afterwards.'
+    )
+
+    config_keys = ['users', 'iterations', 'habits', 'years', 'seed']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Concurrent simulated users.')
+        parser.add_argument('--iterations', type=int, default=20, help='Flows run by each user.')
+        parser.add_argument('--habits', type=int, default=20, help='Habits per user.')
+        parser.add_argument('--years', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON here instead of stdout.')
+
+    def handle(self, *args, output, **options):
+        users = benchmarks.seed(
+            users=options['users'],
+            habits=options['habits'],
+            years=options['years'],
+            seed=options['seed'],
+        )
+        try:
+            HabitSummary.objects.rebuild(Habit.objects.filter(user__in=users))
+            sessions = [
+                (
+                    user,
+                    benchmarks.session_cookie(user),
+                    list(user.habit_set.values_list('pk', flat=True)),
+                    random.Random(f'{options["seed"]}-{i}'),
+                )
+                for i, user in enumerate(users)
+            ]
+            results = self.run(sessions, options['iterations'])
+        finally:
+            get_user_model().objects.filter(pk__in=[user.pk for user in users]).delete()
+        report = json.dumps(
+            {
+                'config': {
+                    **{key: options[key] for key in self.config_keys},
+                    'vendor': connection.vendor,
+                    'storage': settings.HABITS_COMPLETION_STORAGE,
+                },
+                'results': results,
+            },
+            indent=2,
+        )
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def run(self, sessions, iterations):
+        application = get_wsgi_application()
+        hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+        self.host = hosts[0] if hosts else 'localhost'
+        self.secure = settings.SECURE_SSL_REDIRECT
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(len(sessions)) as pool:
+            samples = [
+                sample
+                for user_samples in pool.map(
+                    lambda session: self.simulate(application, iterations, *session),
+                    sessions,
+                )
+                for sample in user_samples
+            ]
+        seconds = time.perf_counter() - started
+        return {
+            'seconds': round(seconds, 3),
+            'requests': len(samples),
+            'requests_per_second': round(len(samples) / seconds, 1),
+            'errors': sum(1 for _, status, _, _ in samples if status >= 400),
+            'latency': benchmarks.summarize([timing for _, _, timing, _ in samples]),
+            'by_url': {
+                name: {
+                    **benchmarks.summarize([
+                        timing for url, _, timing, _ in samples if url == name
+                    ]),
+                    'queries_per_request': round(
+                        sum(queries for url, _, _, queries in samples if url == name)
+                        / sum(1 for url, _, _, _ in samples if url == name),
+                        2,
+                    ),
+                }
+                for name in sorted({url for url, _, _, _ in samples})
+            },
+        }
+
+    def simulate(self, application, iterations, user, cookie, habit_ids, rng):
+        """
+        Run one user's flows against application and return the URL name,
+        status, time and query count of every request.
+        """
+        today = timezone.localdate()
+        samples = []
+        try:
+            for i in range(iterations):
+                habit = rng.choice(habit_ids)
+                date = today - timezone.timedelta(days=rng.randrange(7))
+                flow = [
+                    ('habit_list', 'GET', reverse('habit_list'), {}),
+                    ('habit_list', 'GET', reverse('habit_list'), {'date': date}),
+                    ('toggle_completion', 'POST', reverse('toggle_completion', args=[habit, date]), {}),
+                    ('habit_detail', 'GET', reverse('habit_detail', args=[habit]), {}),
+                    ('toggle_completion', 'POST', reverse('toggle_completion', args=[habit, today]), {}),
+                ]
+                if i % 5 == 4:
+                    flow.append(
+                        ('habit_create', 'POST', reverse('habit_create'), {'name': f'load-{user.pk}-{i}'}),
+                    )
+                for request in flow:
+                    samples.append(self.request(application, cookie, *request))
+        finally:
+            # Each thread has its own connections.
+            connections.close_all()
+        return samples
+
+    def request(self, application, cookie, name, method, path, data):
+        body = urllib.parse.urlencode(data).encode() if method == 'POST' else b''
+        scheme = 'https' if self.secure else 'http'
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': '' if method == 'POST' else urllib.parse.urlencode(data),
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '443' if self.secure else '80',
+            'HTTP_HOST': self.host,
+            # The CSRF check wants a same-origin Origin header over HTTPS.
+            'HTTP_ORIGIN': f'{scheme}://{self.host}',
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_COOKIE': cookie,
+            'HTTP_X_CSRFTOKEN': benchmarks.CSRF_TOKEN,
+            'wsgi.url_scheme': scheme,
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+        }
+        statuses = []
+        counter = QueryCounter()
+        started = time.perf_counter()
+        # Not execute_wrapper(), which pops the last wrapper: the request
+        # reconnects and habits.timing appends its own after this one.
+        connection.execute_wrappers.append(counter)
+        try:
+            response = application(
+                environ, lambda status, headers, exc_info=None: statuses.append(status),
+            )
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+        finally:
+            connection.execute_wrappers.remove(counter)
+        return name, int(statuses[0].split()[0]), time.perf_counter() - started, counter.queries
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
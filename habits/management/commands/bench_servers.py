@@ -0,0 +1,155 @@
+import concurrent.futures
+import http.client
+import json
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from habits import benchmarks
+from habits.models import Habit, HabitSummary
+
+SERVERS = {
+    'wsgi': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn',
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+        '--log-level', 'warning',
+        'habits.wsgi',
+    ],
+    'asgi': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn',
+        '--port', str(port),
+        '--workers', str(workers),
+        '--log-level', 'warning',
+        'habits.asgi:application',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent request throughput, latency and memory of the app '
+        'served by gunicorn (WSGI, sync views) and uvicorn (ASGI, async views). '
+        'Seeded data is deleted afterwards.'
+    )
+
+    config_keys = ['workers', 'concurrency', 'requests', 'habits', 'years']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--habits', type=int, default=20)
+        parser.add_argument('--years', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON here instead of stdout.')
+
+    def handle(self, *args, output, **options):
+        users = benchmarks.seed(
+            habits=options['habits'],
+            years=options['years'],
+            seed=options['seed'],
+        )
+        try:
+            seeded = list(Habit.objects.filter(user__in=users).order_by('pk'))
+            HabitSummary.objects.rebuild(seeded)
+            cookie = benchmarks.session_cookie(users[0])
+            results = {
+                name: self.run(mode, seeded, cookie, env=env, **options)
+                for name, mode, env in self.configurations(**options)
+            }
+        finally:
+            get_user_model().objects.filter(pk__in=[user.pk for user in users]).delete()
+        report = json.dumps(
+            {
+                'config': {key: options[key] for key in self.config_keys},
+                'results': results,
+            },
+            indent=2,
+        )
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def configurations(self, modes, **options):
+        """Yield the name, server mode and extra environment of each run."""
+        for mode in modes:
+            yield mode, mode, {}
+
+    def run(self, mode, seeded, cookie, port, workers, concurrency, requests, env=None, **options):
+        today = timezone.localdate()
+        # Every habit is toggled an even number of times, leaving it as it was.
+        plan = []
+        for i in range(requests):
+            habit = seeded[i // 3 % len(seeded)]
+            plan.append([
+                ('habit_list', 'GET', '/'),
+                ('habit_detail', 'GET', f'/{habit.pk}/'),
+                ('toggle_completion', 'POST', f'/complete/{habit.pk}/{today}/'),
+            ][i % 3])
+        env = {
+            'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+            'HABITS_ASYNC_VIEWS': 'true' if mode == 'asgi' else 'false',
+            **(env or {}),
+        }
+        with benchmarks.serve(SERVERS[mode](port, workers), port, env) as process:
+            idle = benchmarks.tree_rss(process.pid)
+            peak = [idle]
+            done = threading.Event()
+
+            def sample():
+                while not done.wait(0.05):
+                    peak[0] = max(peak[0], benchmarks.tree_rss(process.pid))
+
+            sampler = threading.Thread(target=sample)
+            sampler.start()
+            started = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+                timings = list(pool.map(
+                    lambda request: self.request(port, cookie, *request),
+                    plan,
+                ))
+            seconds = time.perf_counter() - started
+            done.set()
+            sampler.join()
+        errors = sum(1 for _, status, _ in timings if status >= 400)
+        return {
+            'seconds': round(seconds, 3),
+            'requests_per_second': round(len(plan) / seconds, 1),
+            'errors': errors,
+            'latency': benchmarks.summarize([timing for _, _, timing in timings]),
+            'latency_by_view': {
+                name: benchmarks.summarize([
+                    timing for view, _, timing in timings if view == name
+                ])
+                for name in sorted({view for view, _, _ in timings})
+            },
+            'idle_rss_mb': round(idle / 2 ** 20, 1),
+            'peak_rss_mb': round(peak[0] / 2 ** 20, 1),
+        }
+
+    def request(self, port, cookie, name, method, path):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, headers={
+                'Cookie': cookie,
+                'X-CSRFToken': benchmarks.CSRF_TOKEN,
+            })
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except OSError:
+            status = 599
+        finally:
+            connection.close()
+        return name, status, time.perf_counter() - started
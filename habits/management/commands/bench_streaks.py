@@ -0,0 +1,166 @@
+import datetime
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from habits import benchmarks, streaks
+from habits.models import Completion, Habit
+
+PERIODS = (('year', 365), ('month', 30), ('week', 7))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the removed per-habit streak loop, over completions '
+        'prefetched as the habit list used to, with the batch engine in '
+        'habits.streaks on a synthetic dataset, both end to end and over the '
+        'same days already in memory. Nothing is left in the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--habits', type=int, default=100)
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--density', type=float, default=0.7)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if settings.HABITS_COMPLETION_STORAGE != 'rows':
+            raise CommandError(
+                'The per-habit loop reads completion rows; use HABITS_COMPLETION_STORAGE=rows.'
+            )
+        with transaction.atomic():
+            users = benchmarks.seed(
+                habits=options['habits'],
+                years=options['years'],
+                density=options['density'],
+                seed=options['seed'],
+            )
+            habits = Habit.objects.filter(user__in=users)
+            with_completions = habits.prefetch_related(
+                Prefetch('completion_set', queryset=Completion.objects.order_by('-date')),
+            )
+            today = timezone.localdate()
+            per_habit = self.time(
+                lambda: [
+                    legacy_stats(
+                        [completion.date for completion in habit.completion_set.all()],
+                        habit.date_created,
+                        habit.is_bad,
+                        today,
+                    )
+                    # all() so every run queries rather than reusing the last.
+                    for habit in with_completions.all()
+                ],
+                options['repeat'],
+            )
+            batch = self.time(lambda: habits.all().load_stats(), options['repeat'])
+            loaded = [
+                (habit, [completion.date for completion in habit.completion_set.all()])
+                for habit in with_completions
+            ]
+            transaction.set_rollback(True)
+        loop = self.time(
+            lambda: [
+                legacy_stats(dates, habit.date_created, habit.is_bad, today)
+                for habit, dates in loaded
+            ],
+            options['repeat'],
+        )
+        ordinals = [
+            (habit, sorted(date.toordinal() for date in dates))
+            for habit, dates in loaded
+        ]
+        engine = self.time(
+            lambda: [
+                streaks.stats(
+                    days, habit.date_created.toordinal(), habit.is_bad, today.toordinal(),
+                )
+                for habit, days in ordinals
+            ],
+            options['repeat'],
+        )
+        self.stdout.write(f'per habit: {per_habit * 1000:.1f} ms')
+        self.stdout.write(f'batch:     {batch * 1000:.1f} ms')
+        self.stdout.write(f'speedup:   {per_habit / batch:.1f}x')
+        self.stdout.write(f'loop only:   {loop * 1000:.1f} ms')
+        self.stdout.write(f'engine only: {engine * 1000:.1f} ms')
+        self.stdout.write(f'speedup:     {loop / engine:.1f}x')
+
+    def time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+
+def legacy_stats(dates, date_created, is_bad, today):
+    """
+    Habit.stats as it was before habits.streaks, over completion dates
+    ordered from newest to oldest. Kept only as this benchmark's baseline.
+    """
+    stats = {p: {'completions': 0, 'days': d} for p, d in PERIODS}
+    yesterday = today - datetime.timedelta(days=1)
+    completed_streaks = []
+    missed_streaks = []
+    win_streak = 0
+    completed_today = False
+    completed_yesterday = False
+    last_date = yesterday
+    for current_date in dates:
+        if current_date == today:
+            completed_today = True
+            continue
+        delta = (last_date - current_date).days
+        for period, days in PERIODS:
+            if 0 <= (yesterday - current_date).days < days:
+                stats[period]['completions'] += 1
+        if current_date == yesterday:
+            completed_yesterday = True
+            win_streak = 1
+            continue
+        elif delta == 1 and (completed_yesterday or last_date != yesterday):
+            win_streak += 1
+        else:
+            if last_date == yesterday and not completed_yesterday:
+                missed_streaks.append(delta)
+            else:
+                missed_streaks.append(delta - 1)
+            completed_streaks.append(win_streak)
+            win_streak = 1
+        last_date = current_date
+    if win_streak:
+        completed_streaks.append(win_streak)
+    start_date = min(date_created, last_date)
+    delta = (last_date - start_date).days
+    if delta > 1:
+        missed_streaks.append(delta)
+    total_days = (yesterday - start_date).days + 1
+    for period, days in PERIODS:
+        stats[period]['days'] = min(days, total_days)
+    stats['win_streaks'] = completed_streaks
+    stats['loss_streaks'] = missed_streaks
+    stats['completed_today'] = completed_today
+    stats['completed_yesterday'] = completed_yesterday
+    current_streak = 0
+    if is_bad:
+        if not (completed_today or completed_yesterday):
+            current_streak = missed_streaks[0] if missed_streaks else 0
+    else:
+        if completed_today:
+            if completed_yesterday:
+                completed_streaks[0] += 1
+            else:
+                completed_streaks.insert(0, 1)
+            current_streak = completed_streaks[0]
+        elif completed_yesterday:
+            current_streak = completed_streaks[0]
+    stats['current_streak'] = current_streak
+    return stats
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from habits import assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Bundle the vendored front-end libraries into habits/static/habits/, '
+        'checking each against its checksum pinned in assets/checksums.json. '
+        'Run collectstatic afterwards to fingerprint and compress them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fetch',
+            action='store_true',
+            help='Download the pinned releases missing from assets/vendor/ first.',
+        )
+        parser.add_argument(
+            '--pin',
+            action='store_true',
+            help=(
+                'Download every release into assets/vendor/ and pin its checksum, '
+                'after changing a version in habits/assets.py.'
+            ),
+        )
+
+    def handle(self, *args, fetch, pin, **options):
+        if pin:
+            for name, checksum in assets.pin().items():
+                self.stdout.write(f'Pinned {name} ({checksum})')
+        try:
+            if fetch:
+                for name in assets.fetch():
+                    self.stdout.write(f'Fetched {name}')
+            sizes = assets.build()
+        except FileNotFoundError as error:
+            raise CommandError(f'{error} Run with --fetch to download them.')
+        except ValueError as error:
+            raise CommandError(f'{error} Run with --pin to pin new releases.')
+        for name, size in sizes.items():
+            self.stdout.write(f'Wrote {name} ({size} bytes)')
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.models import Completion, Habit, open_year
+
+
+class Command(BaseCommand):
+    help = (
+        'Compact the completion rows of closed years into one CompletionYear '
+        'bitmap per habit and year. Each batch of habits is moved in its own '
+        'short transaction, so the app keeps serving meanwhile, and an '
+        'interrupted run can be resumed with --start-after or simply rerun.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            type=int,
+            help='Compact years before this one (default: the first open year).',
+        )
+        parser.add_argument(
+            '--start-after',
+            type=int,
+            default=0,
+            help='Resume after the habit with this id.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Number of habits compacted per transaction.',
+        )
+
+    def handle(self, *args, before, start_after, batch_size, **options):
+        if settings.HABITS_COMPLETION_STORAGE != 'rows':
+            raise CommandError('Only row storage is compacted.')
+        before = before or open_year()
+        if before > open_year():
+            raise CommandError(f'Completions from {open_year()} on are kept as rows.')
+        moved = 0
+        while True:
+            batch = list(
+                Habit.objects.filter(pk__gt=start_after).order_by('pk').values_list(
+                    'pk', flat=True,
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            moved += self.compact(batch, before)
+            start_after = batch[-1]
+        self.stdout.write(f'Compacted {moved} completions from before {before}.')
+
+    def compact(self, habit_ids, before):
+        moved = Completion.objects.compact(habit_ids, before)
+        if moved:
+            self.stdout.write(
+                f'Moved {moved} completions of habits up to {habit_ids[-1]}; '
+                f'resume with --start-after {habit_ids[-1]}.'
+            )
+        return moved
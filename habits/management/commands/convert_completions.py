@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from habits.models import Completion, CompletionYear, Habit
+
+
+class Command(BaseCommand):
+    help = (
+        'Move completions between row storage (one Completion per day) and '
+        'bitmap storage (one CompletionYear per year). Set '
+        'HABITS_COMPLETION_STORAGE to match afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('storage', choices=['rows', 'bitmap'])
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, storage, batch_size, **options):
+        source, target = Completion.objects, CompletionYear.objects
+        if storage == 'rows':
+            source, target = target, source
+        habit_ids = list(Habit.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(habit_ids), batch_size):
+            batch = habit_ids[start:start + batch_size]
+            with transaction.atomic():
+                days = target.days_by_habit(batch)
+                for habit_id, source_days in source.days_by_habit(batch).items():
+                    days[habit_id] = sorted(
+                        set(days.get(habit_id, [])) | set(source_days)
+                    )
+                source.filter(habit__in=batch).delete()
+                target.filter(habit__in=batch).delete()
+                target.create_from_days(days)
+        self.stdout.write(
+            f'Converted completions of {len(habit_ids)} habits to {storage} storage.'
+        )
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from habits import exports
+
+
+class Command(BaseCommand):
+    help = "Stream a user's habits and completions, with their stats, as CSV or JSON lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument(
+            '--format',
+            choices=sorted(exports.CONTENT_TYPES),
+            default='csv',
+        )
+        parser.add_argument('--output', help='Write to this file instead of stdout.')
+
+    def handle(self, *args, email, format, output, **options):
+        try:
+            user = get_user_model().objects.get(email=email)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {email}.')
+        if output:
+            with open(output, 'w', newline='') as f:
+                f.writelines(exports.export(user, format))
+        else:
+            for line in exports.export(user, format):
+                self.stdout.write(line, ending='')
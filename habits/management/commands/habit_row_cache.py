@@ -0,0 +1,24 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from habits import fragments
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the rendered habit row cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after showing them.',
+        )
+
+    def handle(self, *args, reset, **options):
+        counters = fragments.counters()
+        total = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / total, 4) if total else None
+        self.stdout.write(json.dumps(counters))
+        if reset:
+            fragments.reset_counters()
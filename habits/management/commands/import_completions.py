@@ -0,0 +1,43 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from habits import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a user's completion history from CSV or JSON lines with habit "
+        'and date (YYYY-MM-DD) fields, creating missing habits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('path', help="File to import, or - for stdin.")
+        parser.add_argument(
+            '--format',
+            choices=imports.FORMATS,
+            help='Input format (default: guessed from the file extension).',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, email, path, format, batch_size, **options):
+        try:
+            user = get_user_model().objects.get(email=email)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {email}.')
+        format = format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if path == '-':
+            report = imports.import_completions(user, sys.stdin, format, batch_size)
+        else:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                report = imports.import_completions(user, f, format, batch_size)
+        for line, message in report['errors']:
+            self.stderr.write(f'line {line}: {message}')
+        self.stdout.write(
+            f"Imported {report['imported']} completions for {report['habits']} "
+            f"habits ({report['duplicates']} duplicates, {report['invalid']} "
+            f"invalid rows) in {report['seconds']}s, "
+            f"{report['rows_per_second']} rows/s."
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from habits.models import Habit, HabitSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild precomputed habit summaries from completion history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'habit_ids',
+            nargs='*',
+            type=int,
+            help='Only rebuild these habits (default: all habits).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of habits rebuilt per query.',
+        )
+
+    def handle(self, *args, habit_ids, batch_size, **options):
+        habits = Habit.objects.order_by('pk')
+        if habit_ids:
+            habits = habits.filter(pk__in=habit_ids)
+        count = 0
+        batch = []
+        for habit in habits.iterator(chunk_size=batch_size):
+            batch.append(habit)
+            if len(batch) == batch_size:
+                count += len(HabitSummary.objects.rebuild(batch))
+                batch = []
+        if batch:
+            count += len(HabitSummary.objects.rebuild(batch))
+        self.stdout.write(f'Rebuilt {count} habit summaries.')
@@ -0,0 +1,154 @@
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from habits import benchmarks
+
+TOP_PACKAGES = 15
+
+SERVERS = {
+    # Every worker imports the app itself and serves without warming up.
+    'plain': lambda port, config: (
+        [
+            sys.executable, '-m', 'gunicorn',
+            '--config', config,
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', '2',
+            'habits.wsgi',
+        ],
+        {'HABITS_WARMUP': 'false'},
+    ),
+    # gunicorn.conf.py: warmed up once in the master, then forked.
+    'preload': lambda port, config: (
+        [
+            sys.executable, '-m', 'gunicorn',
+            '--config', str(settings.BASE_DIR / 'gunicorn.conf.py'),
+            '--bind', f'127.0.0.1:{port}',
+            'habits.wsgi',
+        ],
+        {},
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the startup of fresh processes up to their first response, with '
+        'and without warming up, and the import time of each installed app, '
+        'and print them as JSON. With --servers, also time gunicorn from '
+        'launch to its first response.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help='Path of the first request.')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--servers', action='store_true')
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--output', help='Write the JSON here instead of stdout.')
+
+    def handle(self, *args, path, runs, servers, port, output, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        report = {'settings': settings.SETTINGS_MODULE, 'path': path}
+        imports = []
+        for mode in ('cold', 'warm'):
+            samples = []
+            for _ in range(runs):
+                process = subprocess.run(
+                    [sys.executable, '-X', 'importtime', '-m', 'habits.startup', mode, path],
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                samples.append(json.loads(process.stdout))
+                if mode == 'cold':
+                    imports.append(self.imports_by_app(process.stderr))
+            report[mode] = {
+                'status': samples[0]['status'],
+                'timings_ms': {
+                    phase: round(statistics.median(
+                        sample['timings_ms'][phase] for sample in samples
+                    ), 1)
+                    for phase in samples[0]['timings_ms']
+                },
+            }
+        app_names = {config.name for config in apps.get_app_configs()}
+        totals = sorted(
+            (
+                (round(statistics.median(run.get(name, 0) for run in imports), 1), name)
+                for name in imports[0]
+            ),
+            reverse=True,
+        )
+        others = [(ms, name) for ms, name in totals if name not in app_names]
+        report['imports_ms'] = {
+            'apps': {name: ms for ms, name in totals if name in app_names},
+            # The slowest other top-level packages, Django's core among them.
+            'other': {name: ms for ms, name in others[:TOP_PACKAGES]},
+        }
+        if servers:
+            # An empty config stops gunicorn from picking up gunicorn.conf.py.
+            with tempfile.NamedTemporaryFile(suffix='.py') as empty:
+                report['time_to_first_response_ms'] = {
+                    name: self.time_to_first_response(
+                        *server(port, empty.name), port, path, runs,
+                    )
+                    for name, server in SERVERS.items()
+                }
+        report = json.dumps(report, indent=2)
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def imports_by_app(self, importtime):
+        """
+        Add up the self time of the modules in an ``-X importtime`` log by
+        installed app, and by top-level package for everything else.
+        """
+        names = sorted((config.name for config in apps.get_app_configs()), key=len, reverse=True)
+        totals = {}
+        for line in importtime.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            self_us, _, module = line[len('import time:'):].split('|')
+            if not self_us.strip().isdigit():
+                continue
+            module = module.strip()
+            name = next(
+                (name for name in names if module == name or module.startswith(name + '.')),
+                module.split('.')[0],
+            )
+            totals[name] = totals.get(name, 0) + int(self_us) / 1000
+        return totals
+
+    def time_to_first_response(self, argv, env, port, path, runs):
+        """Median time from launching the server to its first response."""
+        hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+        headers = {
+            'Host': hosts[0] if hosts else 'localhost',
+            # What the proxy in front of a live deployment would send.
+            'X-Forwarded-Proto': 'https',
+        }
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            with benchmarks.serve(argv, port, env):
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                try:
+                    connection.request('GET', path, headers=headers)
+                    connection.getresponse().read()
+                finally:
+                    connection.close()
+                samples.append(time.perf_counter() - started)
+        return round(statistics.median(samples) * 1000, 1)
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0002_habit_is_bad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitSummary',
+            fields=[
+                ('habit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='habits.habit')),
+                ('first_date', models.DateField(null=True)),
+                ('last_date', models.DateField(null=True)),
+                ('run_start', models.DateField(null=True)),
+                ('longest_run', models.PositiveIntegerField(default=0)),
+                ('longest_gap', models.PositiveIntegerField(default=0)),
+                ('counted_on', models.DateField(null=True)),
+                ('year_completions', models.PositiveIntegerField(default=0)),
+                ('month_completions', models.PositiveIntegerField(default=0)),
+                ('week_completions', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:51
+
+from django.db import migrations, models
+
+
+def remove_duplicate_completions(apps, schema_editor):
+    Completion = apps.get_model('habits', 'Completion')
+    duplicates = Completion.objects.values('habit', 'date').annotate(
+        keep=models.Min('pk'),
+        count=models.Count('pk'),
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        Completion.objects.filter(
+            habit=duplicate['habit'],
+            date=duplicate['date'],
+        ).exclude(pk=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0003_habitsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_completions,
+            migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='completion',
+            constraint=models.UniqueConstraint(fields=('habit', 'date'), name='unique_completion_per_day'),
+        ),
+    ]
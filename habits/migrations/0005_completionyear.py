@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0004_unique_completion_per_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletionYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('days_0', models.BigIntegerField(default=0)),
+                ('days_1', models.BigIntegerField(default=0)),
+                ('days_2', models.BigIntegerField(default=0)),
+                ('days_3', models.BigIntegerField(default=0)),
+                ('days_4', models.BigIntegerField(default=0)),
+                ('days_5', models.BigIntegerField(default=0)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='habits.habit')),
+            ],
+            options={
+                'ordering': ['-year'],
+                'constraints': [models.UniqueConstraint(fields=('habit', 'year'), name='unique_completion_year')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0006_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habitsummary',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
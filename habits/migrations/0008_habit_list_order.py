@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0007_habitsummary_updated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', 'is_bad', 'name', 'id'], name='habit_list_order'),
+        ),
+    ]
@@ -1,26 +1,165 @@
+import datetime
+import heapq
 from functools import cached_property
 
 from django.conf import settings
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from . import bitmaps, fragments, streaks
+from .expressions import CurrentStreak, LongestStreak
+
+
+def completions():
+    """
+    Return the manager of the configured completion storage, either one
+    Completion row per day or one CompletionYear bitmap per habit and year.
+    Both expose the same queryset API.
+    """
+    if settings.HABITS_COMPLETION_STORAGE == 'bitmap':
+        return CompletionYear.objects
+    return Completion.objects
+
+
+def open_year(today=None):
+    """
+    Return the first year whose completions row storage keeps as Completion
+    rows. The widest period window and the recent window reach back into
+    that year but no further, so completions of earlier, closed years can be
+    compacted into CompletionYear bitmaps without slowing the hot paths.
+    """
+    today = today or timezone.localdate()
+    reach = max(
+        max(days for _, days in streaks.PERIODS),
+        settings.HABITS_RECENT_WINDOW_DAYS,
+    )
+    return (today - datetime.timedelta(days=reach)).year
+
 
 class HabitQuerySet(models.QuerySet):
     def with_completion_status(self, date):
-        return self.prefetch_related(
-            models.Prefetch(
-                'completion_set',
-                queryset=Completion.objects.order_by('-date'),
-            )
-        ).annotate(
-            is_completed=models.Exists(
+        """
+        Annotate whether each habit was completed on date and load what is
+        needed to show its current streak: the summary, or for habits that
+        don't have one yet, the completions in the recent window.
+        """
+        since = timezone.localdate() - timezone.timedelta(
+            days=settings.HABITS_RECENT_WINDOW_DAYS,
+        )
+        return self.with_summary().annotate(
+            is_completed=completions().completed_on(date),
+        ).prefetch_related(
+            completions().filter(habit__summary__isnull=True).recent(since)
+        )
+
+    def with_summary(self):
+        return self.select_related('summary')
+
+    def with_streaks(self):
+        """
+        Annotate the current and longest streak and whether the habit was
+        completed today, computed in the database. Only row storage is
+        supported; with bitmap storage the queryset is returned unchanged and
+        streaks are computed in Python, as they are for habits with compacted
+        years, which the annotations don't see.
+        """
+        if completions() is not Completion.objects:
+            return self
+        today = timezone.localdate()
+        return self.annotate(
+            annotated_current_streak=CurrentStreak(today),
+            annotated_longest_streak=LongestStreak(today),
+            annotated_completed_today=Completion.objects.completed_on(today),
+            has_compacted_years=models.Exists(
+                CompletionYear.objects.filter(habit=models.OuterRef('pk')),
+            ),
+        )
+
+    def with_period_counts(self, as_of=None):
+        """
+        Annotate each habit's completions in every period window ending the
+        day before as_of (today by default) and its first completion date,
+        counted in the database with one conditional aggregate per period.
+        Only row storage is supported; with bitmap storage the queryset is
+        returned unchanged and period stats come from the summary. Windows
+        reaching into compacted years only count the rows still stored.
+        """
+        if completions() is not Completion.objects:
+            return self
+        as_of = as_of or timezone.localdate()
+        since = as_of - timezone.timedelta(days=max(d for _, d in streaks.PERIODS))
+        # Joining only the widest window lets the (habit, date) index bound it.
+        return self.annotate(
+            recent_completion=models.FilteredRelation(
+                'completion',
+                condition=models.Q(
+                    completion__date__gte=since,
+                    completion__date__lt=as_of,
+                ),
+            ),
+            period_counts_as_of=models.Value(as_of, output_field=models.DateField()),
+            first_completion=models.Subquery(
                 Completion.objects.filter(
                     habit=models.OuterRef('pk'),
-                    date=date,
+                ).order_by('date').values('date')[:1],
+            ),
+            first_compacted_year=models.Subquery(
+                CompletionYear.objects.filter(
+                    habit=models.OuterRef('pk'),
+                ).order_by('year').values('year')[:1],
+            ),
+            **{
+                f'annotated_{period}_completions': models.Count(
+                    'recent_completion',
+                    filter=models.Q(
+                        recent_completion__date__gte=as_of - timezone.timedelta(days=days),
+                    ),
                 )
-            )
+                for period, days in streaks.PERIODS
+            },
+        )
+
+    def with_completion_count(self):
+        """
+        Annotate each habit's number of completion rows, counted by a subquery
+        so that only the habits fetched are counted. Compacted years aren't
+        counted. Only row storage is supported; with bitmap storage the
+        queryset is returned unchanged.
+        """
+        if completions() is not Completion.objects:
+            return self
+        return self.annotate(
+            completion_count=Coalesce(
+                models.Subquery(
+                    Completion.objects.filter(
+                        habit=models.OuterRef('pk'),
+                    ).order_by().values('habit').annotate(
+                        count=models.Count('*'),
+                    ).values('count'),
+                    output_field=models.IntegerField(),
+                ),
+                0,
+            ),
         )
 
+    def load_stats(self):
+        """
+        Evaluate the queryset and compute every habit's stats from a single
+        query over their completions.
+        """
+        habits = list(self)
+        days = completions().days_by_habit(habits)
+        today = timezone.localdate().toordinal()
+        for habit in habits:
+            habit.stats = streaks.stats(
+                days.get(habit.pk, []),
+                habit.date_created.toordinal(),
+                habit.is_bad,
+                today,
+            )
+        return habits
+
 
 class Habit(models.Model):
     user = models.ForeignKey(
@@ -33,7 +172,13 @@ class Habit(models.Model):
 
     objects = HabitQuerySet.as_manager()
 
-    periods = (('year', 365), ('month', 30), ('week', 7))
+    periods = streaks.PERIODS
+
+    class Meta:
+        indexes = [
+            # The habit list's keyset order.
+            models.Index(fields=['user', 'is_bad', 'name', 'id'], name='habit_list_order'),
+        ]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -43,24 +188,102 @@ class Habit(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        habit = super().from_db(db, field_names, values)
+        habit._loaded_values = dict(zip(field_names, values))
+        return habit
+
+    def has_changed(self, update_fields=None):
+        """
+        Whether saving would write a value other than the one loaded from the
+        database, to any of update_fields if given. New habits have changed.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return True
+        if update_fields is None:
+            attnames = [field.attname for field in self._meta.concrete_fields]
+        else:
+            attnames = [self._meta.get_field(name).attname for name in update_fields]
+        return any(
+            attname in self.__dict__
+            and (attname not in loaded or self.__dict__[attname] != loaded[attname])
+            for attname in attnames
+        )
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        changed = self.has_changed(update_fields)
+        super().save(*args, **kwargs)
+        fields = self._meta.concrete_fields
+        if update_fields is not None:
+            fields = [self._meta.get_field(name) for name in update_fields]
+        self._loaded_values = {
+            **getattr(self, '_loaded_values', {}),
+            **{
+                field.attname: self.__dict__[field.attname]
+                for field in fields
+                if field.attname in self.__dict__
+            },
+        }
+        if changed and not adding:
+            # The API's validators follow summary updates, and a rename or an
+            # is_bad change alters its responses too.
+            HabitSummary.objects.filter(habit=self).update(updated=timezone.now())
+            fragments.bump_version(self.pk)
+
     def toggle_completion(self, date=None):
         date = date or timezone.localdate()
+        summary = self.get_summary()
+        self.is_completed = completions().toggle(self, date)
         if self.is_completed:
-            self.completion_set.filter(date=date).delete()
+            summary.add(date)
         else:
-            self.complete(date)
+            summary.remove(date)
+        fragments.bump_version(self.pk)
         return self
 
     def complete(self, date=None):
         date = date or timezone.localdate()
-        return Completion.objects.create(habit=self, date=date)
+        summary = self.get_summary()
+        if completions().set(self, date):
+            summary.add(date)
+            fragments.bump_version(self.pk)
 
     def uncomplete(self, date=None):
         date = date or timezone.localdate()
-        self.completion_set.filter(date=date).delete()
+        summary = self.get_summary()
+        if completions().unset(self, date):
+            summary.remove(date)
+            fragments.bump_version(self.pk)
+
+    def get_summary(self):
+        try:
+            return self.summary
+        except HabitSummary.DoesNotExist:
+            summary = HabitSummary(habit=self)
+            summary.rebuild()
+            self.summary = summary
+            return summary
+
+    @property
+    def _loaded_summary(self):
+        if Habit.summary.is_cached(self):
+            return getattr(self, 'summary', None)
 
     def _is_completed(self, date):
-        return self.completion_set.filter(date=date).exists()
+        return date.toordinal() in self.completion_days(since=date)
+
+    def completion_days(self, since=None):
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if completions() is Completion.objects and since is None and 'completion_set' in prefetched:
+            # Use prefetched completions, and the compacted years with them.
+            days = streaks.ordinals(c.date for c in self.completion_set.all())
+            compacted = [day for year in self.completionyear_set.all() for day in year.days()]
+            return sorted(set(days).union(compacted)) if compacted else days
+        return completions().days_by_habit([self], since).get(self.pk, [])
 
     @property
     def streaks(self):
@@ -68,16 +291,32 @@ class Habit(models.Model):
 
     @property
     def current_streak(self):
+        if hasattr(self, 'annotated_current_streak') and not self.has_compacted_years:
+            return self.annotated_current_streak
+        if self._loaded_summary:
+            return self._loaded_summary.current_streak
+        if self.recent_stats:
+            return self.recent_stats['current_streak']
         if hasattr(self, 'stats'):
             return self.stats['current_streak']
         return self.quick_stats[0]
 
     @property
     def longest_streak(self):
+        if hasattr(self, 'annotated_longest_streak') and not self.has_compacted_years:
+            return self.annotated_longest_streak
+        if self._loaded_summary:
+            return self._loaded_summary.longest_streak
         return max(self.streaks) if self.streaks else 0
 
     @property
     def completed_today(self):
+        if hasattr(self, 'annotated_completed_today'):
+            return self.annotated_completed_today
+        if self._loaded_summary:
+            return self._loaded_summary.completed_today
+        if self.recent_stats:
+            return self.recent_stats['completed_today']
         if hasattr(self, 'stats'):
             return self.stats['completed_today']
         return self.quick_stats[1]
@@ -92,108 +331,724 @@ class Habit(models.Model):
         else:
             return f'⏳ {self.current_streak} day streak on the line!'
 
+    def period_stats(self):
+        """
+        Completions and elapsed days in each period window, from the
+        with_period_counts annotations if present, else from the summary.
+        """
+        if not hasattr(self, 'period_counts_as_of'):
+            return self.get_summary().period_stats()
+        as_of = self.period_counts_as_of
+        first = self.first_completion
+        if first is None or first >= as_of:
+            first = as_of - timezone.timedelta(days=1)
+        if self.first_compacted_year is not None:
+            # Any day of a compacted year is outside every window.
+            first = min(first, datetime.date(self.first_compacted_year, 1, 1))
+        lengths = streaks.period_lengths(
+            min(self.date_created, first).toordinal(),
+            as_of.toordinal(),
+        )
+        return {
+            period: {
+                'completions': getattr(self, f'annotated_{period}_completions'),
+                'days': lengths[period],
+            }
+            for period, _ in self.periods
+        }
+
     @cached_property
     def stats(self):
-        stats = {p: {'completions': 0, 'days': d} for p, d in self.periods}
-        today = timezone.localdate()
-        yesterday = today - timezone.timedelta(days=1)
-        completed_streaks = []
-        missed_streaks = []
-        win_streak = 0
-        completed_today = False
-        completed_yesterday = False
-        last_date = yesterday
-        for completion in self.completion_set.all():
-            current_date = completion.date
-            if current_date == today:
-                completed_today = True
-                continue
-            delta = (last_date - current_date).days
-            for period, days in self.periods:
-                if 0 <= (yesterday - current_date).days < days:
-                    stats[period]['completions'] += 1
-            if current_date == yesterday:
-                completed_yesterday = True
-                win_streak = 1
-                continue
-            elif delta == 1 and (completed_yesterday or last_date != yesterday):
-                win_streak += 1
-            else:
-                if last_date == yesterday and not completed_yesterday:
-                    missed_streaks.append(delta)
-                else:
-                    missed_streaks.append(delta - 1)
-                completed_streaks.append(win_streak)
-                win_streak = 1
-            last_date = current_date
-        if win_streak:
-            completed_streaks.append(win_streak)
-        start_date = min(self.date_created, last_date)
-        delta = (last_date - start_date).days
-        if delta > 1:
-            missed_streaks.append(delta)
-        total_days = (yesterday - start_date).days + 1
-        for period, days in self.periods:
-            stats[period]['days'] = min(days, total_days)
-        stats['win_streaks'] = completed_streaks
-        stats['loss_streaks'] = missed_streaks
-        stats['completed_today'] = completed_today
-        stats['completed_yesterday'] = completed_yesterday
-        current_streak = 0
+        return streaks.stats(
+            self.completion_days(),
+            self.date_created.toordinal(),
+            self.is_bad,
+            timezone.localdate().toordinal(),
+        )
+
+    @cached_property
+    def recent_stats(self):
+        """
+        Stats computed from prefetched recent completions, or None if they
+        weren't prefetched or don't reach back to the start of the current
+        streak. Only the current streak and completed_today are reliable.
+        """
+        if not hasattr(self, 'recent_completions'):
+            return None
+        today = timezone.localdate().toordinal()
+        since = today - settings.HABITS_RECENT_WINDOW_DAYS
+        days = sorted(
+            day
+            for completion in self.recent_completions
+            for day in completion.days()
+            if day >= since
+        )
+        stats = streaks.stats(
+            days,
+            self.date_created.toordinal(),
+            self.is_bad,
+            today,
+        )
         if self.is_bad:
-            if not (completed_today or completed_yesterday):
-                current_streak = missed_streaks[0] if missed_streaks else 0
-        else:
-            if completed_today:
-                if completed_yesterday:
-                    completed_streaks[0] += 1
-                else:
-                    completed_streaks.insert(0, 1)
-                current_streak = completed_streaks[0]
-            elif completed_yesterday:
-                current_streak = completed_streaks[0]
-        stats['current_streak'] = current_streak
+            if not (days and days[0] <= today):
+                return None
+        elif today - stats['current_streak'] <= since:
+            return None
         return stats
 
     @cached_property
     def quick_stats(self):
-        streak = 0
-        date = today = timezone.localdate()
-        completion = self.completion_set.first()
-        completed_today = completion and completion.date == today
-        if self.is_bad:
-            start = completion.date if completion else self.date_created
-            if not completed_today:
-                yesterday = today - timezone.timedelta(days=1)
-                streak = (yesterday - start).days
-            return streak, completed_today
-
-        last_date = None
-        for completion in self.completion_set.all():
-            start = completion.date
-            if completion.date > today:
-                continue
-            if last_date == completion.date:
-                continue
-            last_date = completion.date
-            if date == today:
-                date -= timezone.timedelta(days=1)
-                if completion.date == today:
-                    streak += 1
-                    continue
-            if completion.date != date:
-                break
-            streak += 1
-            date -= timezone.timedelta(days=1)
-        return streak, completed_today
+        return self.stats['current_streak'], self.stats['completed_today']
+
+
+class CompletionQuerySet(models.QuerySet):
+    """
+    Completions stored as one row per habit and day.
+
+    Closed years, those before ``open_year()``, can be compacted into
+    CompletionYear bitmaps with ``compact``. Reads that reach back into
+    closed years merge in the compacted years, and writes to closed years
+    go to the bitmaps, so a habit's history reads the same either way.
+    """
+
+    def days_by_habit(self, habits, since=None):
+        completions = self.filter(habit__in=habits)
+        if since is not None:
+            completions = completions.filter(date__gte=since)
+        days_by_habit = streaks.group_days(
+            completions.order_by('habit', 'date').values_list('habit_id', 'date')
+        )
+        if since is None or since.year < open_year():
+            for habit_id, days in CompletionYear.objects.days_by_habit(habits, since).items():
+                days_by_habit[habit_id] = sorted(set(days).union(days_by_habit.get(habit_id, [])))
+        return days_by_habit
+
+    def days_between(self, habits, start, end):
+        """
+        Return the day ordinals of habits' completions from start to end,
+        inclusive, by habit id, from a single range query unless the range
+        reaches into compacted years.
+        """
+        days_by_habit = streaks.group_days(
+            self.filter(habit__in=habits, date__range=(start, end)).order_by(
+                'habit', 'date',
+            ).values_list('habit_id', 'date')
+        )
+        if start.year < open_year():
+            for habit_id, days in CompletionYear.objects.days_between(habits, start, end).items():
+                days_by_habit[habit_id] = sorted(set(days).union(days_by_habit.get(habit_id, [])))
+        return days_by_habit
+
+    def iter_days(self, habits=None, chunk_size=2000):
+        """
+        Yield (habit id, day ordinal) pairs of habits, or of every habit,
+        ordered by habit and day, fetching chunk_size rows at a time.
+        """
+        completions = self if habits is None else self.filter(habit__in=habits)
+        rows = (
+            (habit_id, date.toordinal())
+            for habit_id, date in completions.order_by('habit', 'date').values_list(
+                'habit_id', 'date',
+            ).iterator(chunk_size=chunk_size)
+        )
+        compacted = CompletionYear.objects.iter_days(habits)
+        # Both are ordered by habit and day; skip days stored both ways.
+        previous = None
+        for pair in heapq.merge(rows, compacted):
+            if pair != previous:
+                yield pair
+            previous = pair
+
+    def year_days(self, habit, year):
+        """Return the sorted day ordinals of habit's completions in year."""
+        days = [
+            date.toordinal()
+            for date in self.filter(habit=habit, date__year=year).order_by(
+                'date',
+            ).values_list('date', flat=True)
+        ]
+        if year < open_year():
+            days = sorted(set(days).union(CompletionYear.objects.year_days(habit, year)))
+        return days
+
+    def completed_on(self, date):
+        completed = models.Exists(
+            self.filter(habit=models.OuterRef('pk'), date=date)
+        )
+        if date.year >= open_year():
+            return completed
+        return models.ExpressionWrapper(
+            models.Q(completed) | models.Q(CompletionYear.objects.completed_on(date)),
+            output_field=models.BooleanField(),
+        )
+
+    def recent(self, since):
+        return models.Prefetch(
+            'completion_set',
+            queryset=self.filter(date__gte=since),
+            to_attr='recent_completions',
+        )
+
+    def set(self, habit, date):
+        if date.year < open_year():
+            return (
+                not self.filter(habit=habit, date=date).exists()
+                and CompletionYear.objects.set(habit, date)
+            )
+        _, created = self.get_or_create(habit=habit, date=date)
+        return created
+
+    def unset(self, habit, date):
+        deleted, _ = self.filter(habit=habit, date=date).delete()
+        if date.year < open_year():
+            deleted += CompletionYear.objects.unset(habit, date)
+        return bool(deleted)
+
+    def create_from_days(self, days_by_habit):
+        return self.bulk_create(
+            (
+                Completion(habit_id=habit_id, date=datetime.date.fromordinal(day))
+                for habit_id, days in days_by_habit.items()
+                for day in days
+            ),
+            batch_size=1000,
+        )
+
+    def add_days(self, days_by_habit):
+        """
+        Store sets of day ordinals by habit id, skipping days that are already
+        stored, and return how many were new.
+        """
+        days = [day for habit_days in days_by_habit.values() for day in habit_days]
+        if not days:
+            return 0
+        existing = set(
+            self.filter(
+                habit__in=list(days_by_habit),
+                date__range=(
+                    datetime.date.fromordinal(min(days)),
+                    datetime.date.fromordinal(max(days)),
+                ),
+            ).values_list('habit_id', 'date')
+        )
+        new = [
+            Completion(habit_id=habit_id, date=date)
+            for habit_id, habit_days in days_by_habit.items()
+            for date in map(datetime.date.fromordinal, sorted(habit_days))
+            if (habit_id, date) not in existing
+        ]
+        closed = open_year()
+        compacted = {}
+        for completion in new:
+            if completion.date.year < closed:
+                compacted.setdefault(completion.habit_id, []).append(
+                    completion.date.toordinal()
+                )
+        new = [completion for completion in new if completion.date.year >= closed]
+        # Ignore conflicts with days stored concurrently.
+        self.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        return len(new) + CompletionYear.objects.add_days(compacted)
+
+    def remove_days(self, days_by_habit):
+        """
+        Delete sets of day ordinals by habit id in a single statement and
+        return how many were stored.
+        """
+        condition = models.Q()
+        for habit_id, days in days_by_habit.items():
+            condition |= models.Q(
+                habit_id=habit_id,
+                date__in=[datetime.date.fromordinal(day) for day in sorted(days)],
+            )
+        if not condition:
+            return 0
+        deleted, _ = self.filter(condition).delete()
+        closed = datetime.date(open_year(), 1, 1).toordinal()
+        return deleted + CompletionYear.objects.remove_days({
+            habit_id: [day for day in days if day < closed]
+            for habit_id, days in days_by_habit.items()
+        })
+
+    def compact(self, habits, before=None):
+        """
+        Move the completions of habits in the years before before, by default
+        the open year, into CompletionYear bitmaps and return how many rows
+        were moved. The rows are locked while they move, so a completion
+        toggled meanwhile waits and then finds its day in the bitmap.
+        """
+        first_open = open_year()
+        before = before or first_open
+        if before > first_open:
+            raise ValueError(f'Completions from {first_open} on are kept as rows.')
+        closed = self.filter(habit__in=habits, date__lt=datetime.date(before, 1, 1))
+        with transaction.atomic():
+            days = streaks.group_days(
+                closed.select_for_update().order_by('habit', 'date').values_list(
+                    'habit_id', 'date',
+                )
+            )
+            if not days:
+                return 0
+            CompletionYear.objects.add_days(days)
+            deleted, _ = closed.delete()
+        return deleted
+
+    def toggle(self, habit, date):
+        """
+        Delete the habit's completion for date, or create it if there was
+        none, and return whether the habit is now completed.
+        """
+        if date.year < open_year():
+            with transaction.atomic():
+                return not self.unset(habit, date) and self.set(habit, date)
+        if connection.vendor != 'postgresql':
+            deleted, _ = self.filter(habit=habit, date=date).delete()
+            if not deleted:
+                self.create(habit=habit, date=date)
+            return not deleted
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'''
+                WITH deleted AS (
+                    DELETE FROM {table}
+                    WHERE habit_id = %(habit)s AND date = %(date)s
+                    RETURNING id
+                )
+                INSERT INTO {table} (habit_id, date)
+                SELECT %(habit)s, %(date)s
+                WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                RETURNING id
+                ''',
+                {'habit': habit.pk, 'date': date},
+            )
+            return cursor.fetchone() is not None
 
 
 class Completion(models.Model):
     habit = models.ForeignKey(Habit, on_delete=models.CASCADE)
     date = models.DateField(auto_now_add=False)
 
+    objects = CompletionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['habit', 'date'],
+                name='unique_completion_per_day',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.habit.name}: {self.date}'
+
+    def days(self):
+        return [self.date.toordinal()]
+
+
+class HabitSummaryQuerySet(models.QuerySet):
+    def build(self, habits, today=None):
+        """
+        Compute the summaries of many habits from a single query over their
+        completions and set them on the habits, without saving them.
+        """
+        today = today or timezone.localdate()
+        habits = list(habits)
+        days = completions().days_by_habit(habits)
+        summaries = []
+        for habit in habits:
+            summary = HabitSummary(habit=habit)
+            summary._update(days.get(habit.pk, []), today)
+            habit.summary = summary
+            summaries.append(summary)
+        return summaries
+
+    def rebuild(self, habits, today=None):
+        """Build and save the summaries of many habits."""
+        return self.bulk_create(
+            self.build(habits, today),
+            update_conflicts=True,
+            unique_fields=['habit'],
+            update_fields=[
+                field.name for field in HabitSummary._meta.concrete_fields
+                if not field.primary_key
+            ],
+        )
+
+
+class HabitSummary(models.Model):
+    """
+    Precomputed streak and period stats for a habit.
+
+    Only facts that don't depend on the current date are stored, so the
+    streak values can be derived in constant time on any later day. Period
+    counts are relative to today and are recounted once a day on read.
+    """
+    habit = models.OneToOneField(
+        Habit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary',
+    )
+    first_date = models.DateField(null=True)
+    last_date = models.DateField(null=True)
+    run_start = models.DateField(null=True)
+    longest_run = models.PositiveIntegerField(default=0)
+    longest_gap = models.PositiveIntegerField(default=0)
+    counted_on = models.DateField(null=True)
+    year_completions = models.PositiveIntegerField(default=0)
+    month_completions = models.PositiveIntegerField(default=0)
+    week_completions = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = HabitSummaryQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.habit.name} summary'
+
+    def rebuild(self, today=None):
+        today = today or timezone.localdate()
+        self._update(self.habit.completion_days(), today)
+        self.save()
+
+    def _update(self, days, today):
+        for field, value in streaks.summarize(days, today.toordinal()).items():
+            if isinstance(self._meta.get_field(field), models.DateField):
+                value = value and datetime.date.fromordinal(value)
+            setattr(self, field, value)
+        self.counted_on = today
+
+    def add(self, date):
+        if self.last_date is not None and date < self.last_date:
+            return self.rebuild()
+        self._extend(date)
+        self.save()
+
+    def remove(self, date):
+        run = (self.last_date - self.run_start).days + 1 if self.last_date else 0
+        if date != self.last_date or not 1 < run < self.longest_run:
+            return self.rebuild()
+        self.last_date -= timezone.timedelta(days=1)
+        self._count(date, -1)
+        self.save()
+
+    def _extend(self, date):
+        if self.last_date is None:
+            self.first_date = self.run_start = date
+        elif date - self.last_date > timezone.timedelta(days=1):
+            gap = (date - self.last_date).days - 1
+            self.longest_gap = max(self.longest_gap, gap)
+            self.run_start = date
+        self.last_date = date
+        self.longest_run = max(
+            self.longest_run,
+            (date - self.run_start).days + 1,
+        )
+        self._count(date, 1)
+
+    def _count(self, date, n):
+        if self.counted_on is None or date >= self.counted_on:
+            return
+        for period, days in Habit.periods:
+            if (self.counted_on - date).days <= days:
+                field = f'{period}_completions'
+                setattr(self, field, getattr(self, field) + n)
+
+    def refresh_counts(self, today=None):
+        today = today or timezone.localdate()
+        since = today - timezone.timedelta(days=max(d for _, d in Habit.periods))
+        days = completions().days_by_habit([self.habit_id], since)
+        counts = streaks.period_counts(
+            days.get(self.habit_id, []),
+            today.toordinal(),
+        )
+        self.counted_on = today
+        for period, count in counts.items():
+            setattr(self, f'{period}_completions', count)
+        self.save(update_fields=[
+            'counted_on',
+            *(f'{period}_completions' for period in counts),
+        ])
+
+    @property
+    def completed_today(self):
+        return self.last_date == timezone.localdate()
+
+    @property
+    def current_streak(self):
+        yesterday = timezone.localdate() - timezone.timedelta(days=1)
+        on_streak = self.last_date is not None and self.last_date >= yesterday
+        if not self.habit.is_bad:
+            return (self.last_date - self.run_start).days + 1 if on_streak else 0
+        if on_streak:
+            return 0
+        if self.last_date is not None:
+            return (yesterday - self.last_date).days
+        return self._leading_gap
+
+    @property
+    def longest_streak(self):
+        if not self.habit.is_bad:
+            return self.longest_run
+        yesterday = timezone.localdate() - timezone.timedelta(days=1)
+        open_gap = 0
+        if self.last_date is not None and self.last_date < yesterday:
+            open_gap = (yesterday - self.last_date).days
+        return max(self.longest_gap, open_gap, self._leading_gap)
+
+    @property
+    def _first_day(self):
+        today = timezone.localdate()
+        if self.first_date is not None and self.first_date < today:
+            return self.first_date
+        return today - timezone.timedelta(days=1)
+
+    @property
+    def _leading_gap(self):
+        gap = (self._first_day - self.habit.date_created).days
+        return gap if gap > 1 else 0
+
+    def period_stats(self):
+        today = timezone.localdate()
+        if self.counted_on != today:
+            self.refresh_counts(today)
+        lengths = streaks.period_lengths(
+            min(self.habit.date_created, self._first_day).toordinal(),
+            today.toordinal(),
+        )
+        return {
+            period: {
+                'completions': getattr(self, f'{period}_completions'),
+                'days': lengths[period],
+            }
+            for period, _ in Habit.periods
+        }
+
+
+class CompletionYearQuerySet(models.QuerySet):
+    def days_by_habit(self, habits, since=None):
+        years = self.filter(habit__in=habits)
+        if since is not None:
+            years = years.filter(year__gte=since.year)
+        days_by_habit = {}
+        for habit_id, year, *words in years.order_by('habit', 'year').values_list(
+            'habit_id', 'year', *CompletionYear.word_fields,
+        ):
+            days_by_habit.setdefault(habit_id, []).extend(
+                bitmaps.unpack(year, words)
+            )
+        if since is not None:
+            since = since.toordinal()
+            for habit_id, days in days_by_habit.items():
+                days_by_habit[habit_id] = [day for day in days if day >= since]
+        return days_by_habit
+
+    def days_between(self, habits, start, end):
+        """
+        Return the day ordinals of habits' completions from start to end,
+        inclusive, by habit id.
+        """
+        last = end.toordinal()
+        return {
+            habit_id: [day for day in days if day <= last]
+            for habit_id, days in self.filter(year__lte=end.year).days_by_habit(
+                habits, since=start,
+            ).items()
+        }
+
+    def iter_days(self, habits=None, chunk_size=200):
+        """
+        Yield (habit id, day ordinal) pairs of habits, or of every habit,
+        ordered by habit and day, fetching chunk_size years at a time.
+        """
+        years = self if habits is None else self.filter(habit__in=habits)
+        for habit_id, year, *words in years.order_by('habit', 'year').values_list(
+            'habit_id', 'year', *CompletionYear.word_fields,
+        ).iterator(chunk_size=chunk_size):
+            for day in bitmaps.unpack(year, words):
+                yield habit_id, day
+
+    def year_days(self, habit, year):
+        """Return the sorted day ordinals of habit's completions in year."""
+        words = self.filter(habit=habit, year=year).values_list(
+            *CompletionYear.word_fields,
+        ).first()
+        return bitmaps.unpack(year, words) if words else []
+
+    def completed_on(self, date):
+        year, word, mask = bitmaps.locate(date)
+        return models.Exists(
+            self.filter(
+                models.lookups.GreaterThan(
+                    models.F(CompletionYear.word_fields[word]).bitand(mask),
+                    0,
+                ),
+                habit=models.OuterRef('pk'),
+                year=year,
+            )
+        )
+
+    def recent(self, since):
+        return models.Prefetch(
+            'completionyear_set',
+            queryset=self.filter(year__gte=since.year),
+            to_attr='recent_completions',
+        )
+
+    def set(self, habit, date):
+        return self._upsert(habit, date, '{field} | %s', 'WHERE {field} & %s = 0')
+
+    def unset(self, habit, date):
+        year, word, mask = bitmaps.locate(date)
+        field = CompletionYear.word_fields[word]
+        return bool(
+            self.filter(
+                models.lookups.GreaterThan(models.F(field).bitand(mask), 0),
+                habit=habit,
+                year=year,
+            ).update(**{field: models.F(field).bitand(~mask)})
+        )
+
+    def toggle(self, habit, date):
+        """
+        Flip the habit's bit for date in a single upsert and return whether
+        the habit is now completed.
+        """
+        return self._upsert(
+            habit,
+            date,
+            'CASE WHEN {field} & %s = 0 THEN {field} | %s ELSE {field} & ~%s END',
+        )
+
+    def _upsert(self, habit, date, update, where=''):
+        year, word, mask = bitmaps.locate(date)
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        field = f'{table}.{CompletionYear.word_fields[word]}'
+        columns = ', '.join(CompletionYear.word_fields)
+        words = [mask if i == word else 0 for i in range(bitmaps.WORDS)]
+        update, where = update.format(field=field), where.format(field=field)
+        params = [habit.pk, year, *words]
+        params += [mask] * (update.count('%s') + where.count('%s'))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'''
+                INSERT INTO {table} (habit_id, year, {columns})
+                VALUES (%s, %s, {', '.join(['%s'] * bitmaps.WORDS)})
+                ON CONFLICT (habit_id, year)
+                DO UPDATE SET {CompletionYear.word_fields[word]} = {update} {where}
+                RETURNING {CompletionYear.word_fields[word]}
+                ''',
+                params,
+            )
+            row = cursor.fetchone()
+        return row is not None and bool(row[0] & mask)
+
+    def create_from_days(self, days_by_habit):
+        return self.bulk_create(
+            CompletionYear(habit_id=habit_id, year=year, **dict(
+                zip(CompletionYear.word_fields, words)
+            ))
+            for habit_id, days in days_by_habit.items()
+            for year, words in bitmaps.pack(days).items()
+        )
+
+    def add_days(self, days_by_habit):
+        """
+        Set the bits of sets of day ordinals by habit id, merging them into the
+        stored years, and return how many days were new.
+        """
+        packed = {
+            (habit_id, year): words
+            for habit_id, days in days_by_habit.items()
+            for year, words in bitmaps.pack(sorted(days)).items()
+        }
+        if not packed:
+            return 0
+        with transaction.atomic():
+            stored = {
+                (habit_id, year): words
+                for habit_id, year, *words in self.select_for_update().filter(
+                    habit__in=list(days_by_habit),
+                    year__in={year for _, year in packed},
+                ).values_list('habit_id', 'year', *CompletionYear.word_fields)
+            }
+            new = 0
+            years = []
+            for (habit_id, year), words in packed.items():
+                old = stored.get((habit_id, year), [0] * bitmaps.WORDS)
+                pairs = list(zip(words, old))
+                new += sum((word & ~old_word).bit_count() for word, old_word in pairs)
+                years.append(CompletionYear(habit_id=habit_id, year=year, **dict(
+                    zip(CompletionYear.word_fields, (word | old_word for word, old_word in pairs))
+                )))
+            self.bulk_create(
+                years,
+                update_conflicts=True,
+                unique_fields=['habit', 'year'],
+                update_fields=list(CompletionYear.word_fields),
+            )
+        return new
+
+    def remove_days(self, days_by_habit):
+        """
+        Clear the bits of sets of day ordinals by habit id and return how many
+        were set.
+        """
+        packed = {
+            (habit_id, year): words
+            for habit_id, days in days_by_habit.items()
+            for year, words in bitmaps.pack(sorted(days)).items()
+        }
+        if not packed:
+            return 0
+        removed = 0
+        changed = []
+        with transaction.atomic():
+            for completion_year in self.select_for_update().filter(
+                habit__in=list(days_by_habit),
+                year__in={year for _, year in packed},
+            ):
+                words = packed.get((completion_year.habit_id, completion_year.year))
+                if words is None:
+                    continue
+                for field, word in zip(CompletionYear.word_fields, words):
+                    stored = getattr(completion_year, field)
+                    removed += (stored & word).bit_count()
+                    setattr(completion_year, field, stored & ~word)
+                changed.append(completion_year)
+            self.bulk_update(changed, CompletionYear.word_fields)
+        return removed
+
+
+class CompletionYear(models.Model):
+    """A habit's completions for one year, one bit per day of the year."""
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    days_0 = models.BigIntegerField(default=0)
+    days_1 = models.BigIntegerField(default=0)
+    days_2 = models.BigIntegerField(default=0)
+    days_3 = models.BigIntegerField(default=0)
+    days_4 = models.BigIntegerField(default=0)
+    days_5 = models.BigIntegerField(default=0)
+
+    objects = CompletionYearQuerySet.as_manager()
+
+    word_fields = tuple(f'days_{i}' for i in range(bitmaps.WORDS))
+
+    class Meta:
+        ordering = ['-year']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['habit', 'year'],
+                name='unique_completion_year',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.habit.name}: {self.year}'
+
+    def days(self):
+        return bitmaps.unpack(self.year, [
+            getattr(self, field) for field in self.word_fields
+        ])
@@ -0,0 +1,50 @@
+"""
+Statistics about database connection reuse in this process.
+
+Every time Django connects, whether it opens a new connection per request,
+reconnects once CONN_MAX_AGE runs out or checks one out of the pool,
+connection_created fires and is counted here. With pooling, the psycopg
+pool's own counters are reported as well: connections in use, requests
+waiting for one and connections the pool has created. Pools are per
+process, so under gunicorn each worker reports its own.
+"""
+
+import os
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_lock = threading.Lock()
+_connects = {}
+
+
+def record(sender, connection, **kwargs):
+    with _lock:
+        _connects[connection.alias] = _connects.get(connection.alias, 0) + 1
+
+
+def mode(alias=DEFAULT_DB_ALIAS):
+    settings_dict = connections[alias].settings_dict
+    if settings_dict.get('OPTIONS', {}).get('pool'):
+        return 'pool'
+    if settings_dict['CONN_MAX_AGE'] != 0:
+        return 'persistent'
+    return 'per-request'
+
+
+def stats(alias=DEFAULT_DB_ALIAS):
+    data = {
+        'pid': os.getpid(),
+        'mode': mode(alias),
+        'connects': _connects.get(alias, 0),
+    }
+    if data['mode'] == 'pool':
+        # The pool only keeps counters that are above zero.
+        pool = connections[alias].pool.get_stats()
+        data.update({
+            'in_use': pool['pool_size'] - pool['pool_available'],
+            'waiting': pool.get('requests_waiting', 0),
+            'created': pool.get('connections_num', 0),
+            'pool': pool,
+        })
+    return data
@@ -0,0 +1,177 @@
+"""
+Opt-in profiling of single requests for staff.
+
+When HABITS_PROFILE_DIR is set, ProfilerMiddleware runs a staff user's
+request under cProfile if it carries a ``profile`` query parameter or an
+``X-Profile`` header, and saves the profile next to a JSON record of the
+request and the SQL it ran. Staff can browse the most recent profiles from
+the admin. Without the setting Django leaves the middleware out, so other
+requests don't pay for it.
+
+The middleware runs in both sync and async request paths. Queries are
+recorded by a database execute wrapper that HabitsConfig installs on every
+connection and that finds the profiled request through a context variable,
+so it also sees the queries async views run in other threads. cProfile only
+follows the thread it is enabled in, though: under ASGI that is the event
+loop, and the sync work an async view hands to a thread shows up as time
+spent waiting for it.
+"""
+
+import contextvars
+import cProfile
+import io
+import json
+import pstats
+import re
+import secrets
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+# Orders the profile page can list functions in.
+SORTS = ['cumulative', 'tottime', 'ncalls']
+
+_current = contextvars.ContextVar('habits_profile_statements', default=None)
+
+
+def profile_dir():
+    return Path(settings.HABITS_PROFILE_DIR)
+
+
+def record_query(execute, sql, params, many, context):
+    """Keep the SQL, parameters and duration of each query of a profiled request."""
+    statements = _current.get()
+    if statements is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        statements.append({
+            'sql': sql,
+            'params': repr(params),
+            'many': many,
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+        })
+
+
+def install(sender, connection, **kwargs):
+    """Add record_query to every new database connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ProfilerMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.HABITS_PROFILE_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.requested(request) or not request.user.is_staff:
+            return self.get_response(request)
+        user = request.user
+        statements = []
+        token = _current.set(statements)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            _current.reset(token)
+        return self.report(request, user, response, profiler, started, statements)
+
+    async def __acall__(self, request):
+        if not self.requested(request):
+            return await self.get_response(request)
+        user = await request.auser()
+        if not user.is_staff:
+            return await self.get_response(request)
+        statements = []
+        token = _current.set(statements)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+            _current.reset(token)
+        return self.report(request, user, response, profiler, started, statements)
+
+    def requested(self, request):
+        return 'profile' in request.GET or 'x-profile' in request.headers
+
+    def report(self, request, user, response, profiler, started, statements):
+        name = save(profiler, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'user': str(user),
+            'status': response.status_code,
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+            'queries': statements,
+        })
+        response['X-Profile'] = name
+        return response
+
+
+def save(profiler, record):
+    """
+    Write profiler's stats and record to the profile directory, drop all but
+    the HABITS_PROFILE_KEEP most recent profiles and return the new one's name.
+    """
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    created = timezone.now()
+    # Names sort by creation, which recent() relies on.
+    name = f'{created:%Y%m%d-%H%M%S-%f}-{secrets.token_hex(4)}'
+    profiler.dump_stats(directory / f'{name}.prof')
+    record = {'name': name, 'created': created.isoformat(), **record}
+    (directory / f'{name}.json').write_text(json.dumps(record, indent=2))
+    for old in recent(limit=None)[settings.HABITS_PROFILE_KEEP:]:
+        for suffix in ['.json', '.prof']:
+            (directory / f'{old["name"]}{suffix}').unlink(missing_ok=True)
+    return name
+
+
+def recent(limit=50):
+    """Return the records of the latest profiles, newest first, without their queries."""
+    paths = sorted(profile_dir().glob('*.json'), reverse=True)[:limit]
+    records = []
+    for path in paths:
+        record = json.loads(path.read_text())
+        record['query_count'] = len(record.pop('queries'))
+        records.append(record)
+    return records
+
+
+def load(name, sort='cumulative', match='', lines=60):
+    """
+    Return the record of the profile called name with its stats as text,
+    sorted by sort and limited to functions whose location contains match,
+    or None if there is no such profile.
+    """
+    directory = profile_dir()
+    path = directory / f'{name}.json'
+    if path.parent != directory or not path.exists():
+        return None
+    record = json.loads(path.read_text())
+    stream = io.StringIO()
+    stats = pstats.Stats(str(directory / f'{name}.prof'), stream=stream)
+    restrictions = [re.escape(match)] if match else []
+    stats.sort_stats(sort).print_stats(*restrictions, lines)
+    record['stats'] = stream.getvalue()
+    return record
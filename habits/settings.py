@@ -33,18 +33,20 @@ INSTALLED_APPS = [
     'django.contrib.sites',
 
     'authtools',
-    'django_extensions',
 
     'accounts',
     'habits',
 ]
 
 MIDDLEWARE = [
+    'habits.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'habits.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -53,7 +55,7 @@ ROOT_URLCONF = 'habits.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'habits.timing.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,9 +76,26 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'habits.wsgi.application'
 
+# By default every request opens its own database connection. Set
+# DATABASE_CONN_MAX_AGE (seconds) to keep one open per worker thread, or
+# DATABASE_POOL=true to share a psycopg pool per worker process instead; the
+# pool is opened on first use, so it is created after gunicorn forks.
+# DATABASE_CONN_HEALTH_CHECKS=true checks connections before reusing them.
 DATABASES = {
-    'default': dj_database_url.config(default='postgres:///habits'),
+    'default': dj_database_url.config(
+        default='postgres:///habits',
+        conn_max_age=int(os.getenv('DATABASE_CONN_MAX_AGE', '0')),
+        conn_health_checks=os.getenv('DATABASE_CONN_HEALTH_CHECKS', 'false') == 'true',
+    ),
 }
+if os.getenv('DATABASE_POOL', 'false') == 'true':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', '1')),
+        'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', '4')),
+        'max_lifetime': float(os.getenv('DATABASE_POOL_MAX_LIFETIME', '3600')),
+        'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', '10')),
+    }
 
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -138,3 +157,42 @@ LOGGING = {
 }
 
 LOGIN_URL = '/admin/login'
+
+# Either 'rows' (one Completion per habit and day) or 'bitmap' (one
+# CompletionYear per habit and year). Switch with `manage.py convert_completions`.
+HABITS_COMPLETION_STORAGE = os.getenv('HABITS_COMPLETION_STORAGE', 'rows')
+
+# Serve the habit list, detail and toggle views with their async variants
+# under an ASGI server. Off by default: they still hand their ORM, cache and
+# template work to threads, and bench_servers measured them slower.
+HABITS_ASYNC_VIEWS = os.getenv('HABITS_ASYNC_VIEWS', 'false') == 'true'
+
+# Have the WSGI and ASGI entry points load the URLconf, compile templates and
+# connect to the database before serving (see habits.startup). gunicorn.conf.py
+# turns the database part off in the master and connects each worker instead.
+HABITS_WARMUP = os.getenv('HABITS_WARMUP', 'true') == 'true'
+HABITS_WARMUP_DATABASES = os.getenv('HABITS_WARMUP_DATABASES', 'true') == 'true'
+
+# Habit lists load at most this many days of completions per habit that has
+# no precomputed summary yet; longer streaks fall back to the full history.
+HABITS_RECENT_WINDOW_DAYS = 365
+
+# The habit list renders this many habits at first and loads the rest a page
+# at a time as the user scrolls.
+HABITS_LIST_PAGE_SIZE = 30
+
+# Views (by URL name) whose responses report query, render and view timings
+# in a Server-Timing header and a log line on the habits.timing logger.
+HABITS_SERVER_TIMING_URLS = [
+    'habit_list',
+    'habit_detail',
+    'habit_week',
+    'habit_create',
+    'toggle_completion',
+]
+
+# Staff can profile a request by adding ?profile or an X-Profile header once
+# this names a directory; the profiles are listed at /admin/profiles/. Left
+# empty, the profiling middleware isn't loaded at all.
+HABITS_PROFILE_DIR = os.getenv('HABITS_PROFILE_DIR', '')
+HABITS_PROFILE_KEEP = 50
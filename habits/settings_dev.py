@@ -8,6 +8,10 @@ from .settings import *
 
 DEBUG = True
 
+# Development-only apps stay out of the base settings, so live workers
+# don't import them on every cold start.
+INSTALLED_APPS = INSTALLED_APPS + ['django_extensions']
+
 ALLOWED_HOSTS = ['*']
 
 INTERNAL_IPS = ['127.0.0.1']
@@ -19,3 +23,5 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
     },
 }
+
+HABITS_PROFILE_DIR = os.getenv('HABITS_PROFILE_DIR', str(BASE_DIR / 'profiles'))
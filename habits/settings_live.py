@@ -16,3 +16,23 @@ SECURE_SSL_REDIRECT = True
 
 CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_SECURE = True
+
+# Fingerprint static files and precompress them with gzip and brotli. Fly's
+# [[statics]] mount serves them from /code/static; WhiteNoise serves them,
+# with immutable cache headers, wherever the app is reached directly.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Rendered habit rows and their versions must be shared by all workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    },
+}
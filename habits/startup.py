@@ -0,0 +1,173 @@
+"""
+Startup timing and warmup.
+
+Before a fresh worker can answer its first request it has to import every
+installed app, load the URLconf, compile templates and connect to the
+database, and after a cold start the first user waits for all of it.
+``warmup`` does that work up front: the WSGI and ASGI entry points call it
+when HABITS_WARMUP is on, before the server hands them any requests. It
+only connects where connections outlive a request, through a pool or a
+nonzero CONN_MAX_AGE.
+
+``main`` times each phase of that path in a fresh process, either warming up
+first or going straight to the first request. ``manage.py startup_report``
+runs it under ``python -X importtime`` and adds up the import time of each
+installed app.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.contextmanager
+def timed(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def load_urlconf():
+    """Import every view module and build the reverse lookup tables."""
+    from django.urls import get_resolver
+
+    get_resolver().reverse_dict
+
+
+def project_templates():
+    """Yield (engine, name) for every template under the project directory."""
+    from django.conf import settings
+    from django.template import engines
+
+    base = Path(settings.BASE_DIR).resolve()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            directory = Path(directory).resolve()
+            if base not in directory.parents:
+                continue
+            for path in sorted(directory.rglob('*')):
+                if path.is_file():
+                    yield engine, path.relative_to(directory).as_posix()
+
+
+def compile_templates():
+    """
+    Compile the project's templates into the cached template loader and
+    return how many compiled. Templates that don't compile are logged.
+    """
+    from django.template import TemplateSyntaxError
+
+    compiled = 0
+    for engine, name in project_templates():
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as error:
+            logger.warning(
+                'Template %s does not compile: %s', name, str(error).splitlines()[0],
+            )
+        else:
+            compiled += 1
+    return compiled
+
+
+def connect():
+    """
+    Open every database's connection pool and wait until it holds its
+    minimum number of connections, or where there is no pool but connections
+    persist (CONN_MAX_AGE isn't 0), open this thread's connection. Return the
+    aliases connected.
+
+    A connection that doesn't persist is closed when the first request
+    starts, so opening one here would only add to startup.
+    """
+    from django.db import connections
+
+    connected = []
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            pool.open(wait=True)
+        elif connection.settings_dict['CONN_MAX_AGE'] != 0:
+            connection.ensure_connection()
+        else:
+            continue
+        connected.append(connection.alias)
+    return connected
+
+
+def warmup(databases=True):
+    """
+    Load the URLconf, compile templates and, unless databases is false,
+    connect to the databases, logging how long each took.
+    """
+    timings = {}
+    with timed(timings, 'urlconf'):
+        load_urlconf()
+    with timed(timings, 'templates'):
+        templates = compile_templates()
+    if databases:
+        with timed(timings, 'database'):
+            connect()
+    logger.info(json.dumps({
+        'warmup': timings,
+        'templates': templates,
+        'pid': os.getpid(),
+    }))
+    return timings
+
+
+def request(handler, path, host, secure):
+    """Send a GET for path straight to the WSGI handler; return the status."""
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '443' if secure else '80',
+        'HTTP_HOST': host,
+        'wsgi.url_scheme': 'https' if secure else 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+    statuses = []
+    response = handler(environ, lambda status, headers: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return int(statuses[0].split()[0])
+
+
+def main(warm, path):
+    """Print the timings of each startup phase up to the first response."""
+    timings = {}
+    with timed(timings, 'setup'):
+        import django
+
+        django.setup(set_prefix=False)
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+
+    if warm:
+        timings.update(warmup())
+    with timed(timings, 'handler'):
+        handler = WSGIHandler()
+    hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+    host = hosts[0] if hosts else 'localhost'
+    with timed(timings, 'first_request'):
+        status = request(handler, path, host, settings.SECURE_SSL_REDIRECT)
+    with timed(timings, 'second_request'):
+        request(handler, path, host, settings.SECURE_SSL_REDIRECT)
+    json.dump({'status': status, 'timings_ms': timings}, sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] == 'warm', sys.argv[2])
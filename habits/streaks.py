@@ -0,0 +1,125 @@
+"""
+Streak calculations over sorted arrays of day ordinals.
+
+Every function works on whole arrays at once (run boundaries, gaps and
+period windows are found with list comprehensions and bisection rather than
+by walking completions one at a time), so a user's entire history can be
+fetched with a single ``values_list`` query and summarized per habit.
+"""
+
+from bisect import bisect_left
+from itertools import groupby
+
+PERIODS = (('year', 365), ('month', 30), ('week', 7))
+
+
+def ordinals(dates):
+    return sorted({date.toordinal() for date in dates})
+
+
+def runs(days):
+    """
+    Split sorted, unique day ordinals into runs of consecutive days and
+    return the (starts, ends) of those runs.
+    """
+    if not days:
+        return [], []
+    breaks = [i for i in range(1, len(days)) if days[i] - days[i - 1] > 1]
+    starts = [days[0]] + [days[i] for i in breaks]
+    ends = [days[i - 1] for i in breaks] + [days[-1]]
+    return starts, ends
+
+
+def gaps(starts, ends):
+    return [start - end - 1 for start, end in zip(starts[1:], ends)]
+
+
+def period_counts(days, today):
+    """Count the days in each period window ending yesterday."""
+    end = bisect_left(days, today)
+    return {
+        period: end - bisect_left(days, today - length, 0, end)
+        for period, length in PERIODS
+    }
+
+
+def period_lengths(start, today):
+    """Count the days from start in each period window ending yesterday."""
+    return {period: min(length, today - start) for period, length in PERIODS}
+
+
+def stats(days, date_created, is_bad, today):
+    """
+    Compute the stats reported by ``Habit.stats``.
+
+    Streak lists are ordered from most recent to oldest. ``date_created``
+    and ``today`` are day ordinals as well.
+    """
+    yesterday = today - 1
+    end = bisect_left(days, today)
+    past = days[:end]
+    completed_today = end < len(days) and days[end] == today
+    completed_yesterday = bool(past) and past[-1] == yesterday
+
+    starts, ends = runs(past + [today] if completed_today else past)
+    win_streaks = [end - start + 1 for start, end in zip(starts, ends)][::-1]
+
+    loss_streaks = gaps(*runs(past))[::-1]
+    if past and past[-1] < yesterday:
+        loss_streaks.insert(0, yesterday - past[-1])
+    first = past[0] if past else yesterday
+    if first - date_created > 1:
+        loss_streaks.append(first - date_created)
+
+    counts = period_counts(past, today)
+    lengths = period_lengths(min(date_created, first), today)
+    result = {
+        period: {'completions': counts[period], 'days': lengths[period]}
+        for period, _ in PERIODS
+    }
+    result['win_streaks'] = win_streaks
+    result['loss_streaks'] = loss_streaks
+    result['completed_today'] = completed_today
+    result['completed_yesterday'] = completed_yesterday
+
+    current_streak = 0
+    if is_bad:
+        if not (completed_today or completed_yesterday) and loss_streaks:
+            current_streak = loss_streaks[0]
+    elif completed_today or completed_yesterday:
+        current_streak = win_streaks[0]
+    result['current_streak'] = current_streak
+    return result
+
+
+def summarize(days, today):
+    """
+    Compute the date-independent facts stored on ``HabitSummary``, with
+    dates as ordinals, plus period counts as of today.
+    """
+    starts, ends = runs(days)
+    counts = period_counts(days, today)
+    summary = {
+        'first_date': days[0] if days else None,
+        'last_date': days[-1] if days else None,
+        'run_start': starts[-1] if starts else None,
+        'longest_run': max(
+            (end - start + 1 for start, end in zip(starts, ends)),
+            default=0,
+        ),
+        'longest_gap': max(gaps(starts, ends), default=0),
+    }
+    for period, _ in PERIODS:
+        summary[f'{period}_completions'] = counts[period]
+    return summary
+
+
+def group_days(rows):
+    """
+    Group (habit_id, date) rows, sorted by habit, into day ordinal arrays
+    keyed by habit id.
+    """
+    return {
+        habit_id: ordinals(date for _, date in group)
+        for habit_id, group in groupby(rows, key=lambda row: row[0])
+    }
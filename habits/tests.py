@@ -1,9 +1,26 @@
+import hashlib
+import json
+import tempfile
 from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-from . import models
+from . import admin, api, assets, benchmarks, exports, fragments, imports, models, profiling, startup, streaks, views
+from .management.commands import bench_streaks, startup_report
 
 
 User = get_user_model()
@@ -103,6 +120,13 @@ class StatsTestCase(TestCase):
         )
         self.assertEqual(self.good_habit.current_streak, 4)
 
+    def test_load_stats(self):
+        # Habits, completion rows and compacted years.
+        with self.assertNumQueries(3):
+            habits = models.Habit.objects.order_by('pk').load_stats()
+        self.assertEqual(habits[0].stats, self.good_habit.stats)
+        self.assertEqual(habits[1].stats, self.bad_habit.stats)
+
 
 class QuickStatsTestCase(TestCase):
     def setUp(self):
@@ -144,3 +168,1209 @@ class QuickStatsTestCase(TestCase):
         streak, completed_today = self.bad_habit.quick_stats
         self.assertEqual(streak, 0)
         self.assertTrue(completed_today)
+
+
+class HabitSummaryTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create(email='user@test.com')
+        self.habits = []
+        for is_bad in (False, True):
+            habit = models.Habit.objects.create(
+                user=user,
+                name=f'Habit {is_bad}',
+                is_bad=is_bad,
+            )
+            habit.date_created = get_day(40)
+            habit.save()
+            for days in [1, 2, 3, 6, 7, 8, 9, 10, 12, 13, 18, 35]:
+                models.Completion.objects.create(habit=habit, date=get_day(days))
+            self.habits.append(habit)
+
+    def assertSummaryMatchesStats(self):
+        for habit in self.habits:
+            expected = models.Habit.objects.get(pk=habit.pk)
+            habit = models.Habit.objects.with_summary().get(pk=habit.pk)
+            summary = habit.get_summary()
+            self.assertEqual(habit.current_streak, expected.current_streak)
+            self.assertEqual(habit.longest_streak, expected.longest_streak)
+            self.assertEqual(habit.completed_today, expected.completed_today)
+            stats = summary.period_stats()
+            for period, _ in models.Habit.periods:
+                self.assertEqual(stats[period], expected.stats[period])
+
+    def test_rebuild(self):
+        self.assertSummaryMatchesStats()
+
+    def test_complete_today(self):
+        for habit in self.habits:
+            habit.complete()
+        self.assertSummaryMatchesStats()
+
+    def test_complete_past_date(self):
+        for habit in self.habits:
+            habit.complete(get_day(11))
+        self.assertSummaryMatchesStats()
+
+    def test_uncomplete_last_date(self):
+        for habit in self.habits:
+            habit.uncomplete(get_day(1))
+        self.assertSummaryMatchesStats()
+
+    def test_uncomplete_past_date(self):
+        for habit in self.habits:
+            habit.uncomplete(get_day(8))
+        self.assertSummaryMatchesStats()
+
+    def test_rebuild_many(self):
+        models.HabitSummary.objects.all().delete()
+        with self.assertNumQueries(4):
+            models.HabitSummary.objects.rebuild(models.Habit.objects.all())
+        self.assertSummaryMatchesStats()
+
+    def test_no_completions(self):
+        models.Completion.objects.all().delete()
+        models.HabitSummary.objects.all().delete()
+        self.assertSummaryMatchesStats()
+
+    def test_period_counts(self):
+        models.Completion.objects.create(habit=self.habits[0], date=get_day(0))
+        with self.assertNumQueries(1):
+            habits = list(models.Habit.objects.with_period_counts().order_by('pk'))
+        for habit in habits:
+            stats = habit.period_stats()
+            for period, _ in models.Habit.periods:
+                self.assertEqual(stats[period], habit.stats[period])
+
+    def test_period_counts_as_of(self):
+        as_of = get_day(5)
+        for habit in models.Habit.objects.with_period_counts(as_of):
+            stats = streaks.stats(
+                habit.completion_days(),
+                habit.date_created.toordinal(),
+                habit.is_bad,
+                as_of.toordinal(),
+            )
+            for period, _ in models.Habit.periods:
+                self.assertEqual(habit.period_stats()[period], stats[period])
+
+
+class ToggleCompletionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        for days in [1, 2, 3]:
+            self.habit.complete(get_day(days))
+        self.client.force_login(self.user)
+        self.url = reverse('toggle_completion', args=[self.habit.pk, get_day(0)])
+
+    def test_toggle(self):
+        response = self.client.post(self.url)
+        self.assertTrue(response.context['habit'].is_completed)
+        self.assertContains(response, '4 days and counting!')
+        self.assertTrue(self.habit.completion_set.filter(date=get_day(0)).exists())
+        response = self.client.post(self.url)
+        self.assertFalse(response.context['habit'].is_completed)
+        self.assertContains(response, '3 day streak on the line!')
+        self.assertFalse(self.habit.completion_set.filter(date=get_day(0)).exists())
+
+    def test_toggle_query_count(self):
+        # session, user, savepoint, locked habit, toggle, summary, release
+        toggle_queries = 1 if connection.vendor == 'postgresql' else 2
+        with self.assertNumQueries(6 + toggle_queries):
+            self.client.post(self.url)
+
+    def test_toggle_other_users_habit(self):
+        self.client.force_login(User.objects.create(email='other@test.com'))
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(self.habit.completion_set.filter(date=get_day(0)).exists())
+
+
+@override_settings(HABITS_COMPLETION_STORAGE='bitmap')
+class BitmapStorageTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=user, name='Habit')
+        self.habit.date_created = get_day(400)
+        self.habit.save()
+        self.days = [1, 2, 3, 6, 7, 8, 9, 10, 12, 13, 18, 200, 365, 366, 399]
+        for days in self.days:
+            models.Completion.objects.create(habit=self.habit, date=get_day(days))
+
+    def test_convert(self):
+        with self.settings(HABITS_COMPLETION_STORAGE='rows'):
+            expected = models.Habit.objects.get(pk=self.habit.pk).stats
+        call_command('convert_completions', 'bitmap', stdout=StringIO())
+        self.assertFalse(models.Completion.objects.exists())
+        self.assertLessEqual(models.CompletionYear.objects.count(), 3)
+        self.assertEqual(models.Habit.objects.get(pk=self.habit.pk).stats, expected)
+        call_command('convert_completions', 'rows', stdout=StringIO())
+        self.assertEqual(models.Completion.objects.count(), len(self.days))
+        self.assertFalse(models.CompletionYear.objects.exists())
+
+    def test_completion_status_and_toggle(self):
+        call_command('convert_completions', 'bitmap', stdout=StringIO())
+        for days, completed in [(0, False), (1, True), (4, False), (366, True)]:
+            habit = models.Habit.objects.with_completion_status(get_day(days)).get()
+            self.assertEqual(habit.is_completed, completed)
+            habit.toggle_completion(get_day(days))
+            self.assertEqual(habit.is_completed, not completed)
+            habit = models.Habit.objects.with_completion_status(get_day(days)).get()
+            self.assertEqual(habit.is_completed, not completed)
+
+    def test_complete_and_uncomplete(self):
+        call_command('convert_completions', 'bitmap', stdout=StringIO())
+        self.habit.complete()
+        self.habit.complete()
+        self.habit.uncomplete(get_day(1))
+        habit = models.Habit.objects.with_summary().get()
+        self.assertEqual(habit.summary.current_streak, 1)
+        self.assertEqual(models.Habit.objects.get().current_streak, 1)
+
+
+class CompactionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.habits = []
+        for is_bad in (False, True):
+            habit = models.Habit.objects.create(user=self.user, name=f'Habit {is_bad}', is_bad=is_bad)
+            habit.date_created = get_day(1200)
+            habit.save()
+            days = [1, 2, 3, 9, 10, 300, 1000, 1001, 1050, 1100, 1101]
+            # A streak running from a compacted year into the open years.
+            days += list(range(365, 900))
+            models.Completion.objects.bulk_create(
+                models.Completion(habit=habit, date=get_day(days_ago)) for days_ago in days
+            )
+            self.habits.append(habit)
+        self.closed = datetime(models.open_year(), 1, 1).date()
+
+    def snapshot(self):
+        habits = models.Habit.objects.order_by('pk')
+        return {
+            'stats': [habit.stats for habit in habits],
+            'load_stats': [habit.stats for habit in habits.load_stats()],
+            'streaks': [
+                (habit.current_streak, habit.longest_streak)
+                for habit in habits.with_streaks()
+            ],
+            'period_stats': [habit.period_stats() for habit in habits.with_period_counts()],
+            'years': [
+                models.Completion.objects.year_days(habit, self.closed.year - 1)
+                for habit in habits
+            ],
+            'export': list(exports.rows(self.user)),
+        }
+
+    def test_stats_unchanged(self):
+        expected = self.snapshot()
+        out = StringIO()
+        call_command('compact_completions', batch_size=1, stdout=out)
+        self.assertIn(f'resume with --start-after {self.habits[0].pk}', out.getvalue())
+        self.assertFalse(models.Completion.objects.filter(date__lt=self.closed).exists())
+        self.assertTrue(models.Completion.objects.exists())
+        self.assertEqual(
+            set(models.CompletionYear.objects.values_list('year', flat=True)),
+            set(range(get_day(1101).year, self.closed.year)),
+        )
+        self.assertEqual(self.snapshot(), expected)
+        models.HabitSummary.objects.all().delete()
+        self.assertEqual(self.snapshot(), expected)
+        call_command('compact_completions', stdout=out)
+        self.assertIn('Compacted 0 completions', out.getvalue())
+
+    def test_closed_year_writes(self):
+        call_command('compact_completions', stdout=StringIO())
+        habit = self.habits[0]
+        for days, completed in [(1100, True), (1099, False)]:
+            status = models.Habit.objects.with_completion_status(get_day(days)).get(pk=habit.pk)
+            self.assertEqual(status.is_completed, completed)
+            habit.toggle_completion(get_day(days))
+            self.assertEqual(habit.is_completed, not completed)
+            status = models.Habit.objects.with_completion_status(get_day(days)).get(pk=habit.pk)
+            self.assertEqual(status.is_completed, not completed)
+        self.assertFalse(models.Completion.objects.filter(date__lt=self.closed).exists())
+        self.assertEqual(
+            models.Completion.objects.add_days({habit.pk: [get_day(1099).toordinal(), get_day(1098).toordinal()]}),
+            1,
+        )
+        self.assertEqual(
+            models.Completion.objects.remove_days({habit.pk: [get_day(1098).toordinal(), get_day(1).toordinal()]}),
+            2,
+        )
+        days = habit.completion_days(since=get_day(1101))
+        self.assertIn(get_day(1099).toordinal(), days)
+        self.assertNotIn(get_day(1098).toordinal(), days)
+        self.assertNotIn(get_day(1).toordinal(), days)
+
+    def test_open_years_kept(self):
+        with self.assertRaises(CommandError):
+            call_command('compact_completions', before=self.closed.year + 1, stdout=StringIO())
+
+
+class RecentCompletionsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.client.force_login(self.user)
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        self.habit.date_created = get_day(1000)
+        self.habit.save()
+        models.Completion.objects.bulk_create(
+            models.Completion(habit=self.habit, date=get_day(days))
+            for days in range(1, 1000)
+            if days != 30
+        )
+
+    def get_habit(self):
+        response = self.client.get(reverse('habit_list'))
+        [habit] = response.context['habits']
+        return habit
+
+    def test_rows_loaded_are_capped(self):
+        habit = self.get_habit()
+        self.assertLessEqual(
+            len(habit.recent_completions),
+            settings.HABITS_RECENT_WINDOW_DAYS + 1,
+        )
+        self.assertEqual(habit.current_streak, 29)
+        self.assertNotIn('stats', habit.__dict__)
+
+    def test_streak_longer_than_window(self):
+        models.Completion.objects.create(habit=self.habit, date=get_day(30))
+        habit = self.get_habit()
+        self.assertEqual(habit.current_streak, 999)
+        # The list builds the summary, unsaved, rather than reading the whole history.
+        self.assertEqual(habit.summary.current_streak, 999)
+
+    def test_habits_with_summary_load_no_rows(self):
+        self.habit.get_summary()
+        habit = self.get_habit()
+        self.assertEqual(habit.recent_completions, [])
+        self.assertEqual(habit.current_streak, 29)
+
+
+class WithStreaksTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+
+    def assertStreaksMatch(self):
+        for habit in models.Habit.objects.with_streaks():
+            expected = models.Habit.objects.get(pk=habit.pk)
+            self.assertEqual(
+                (habit.current_streak, habit.longest_streak, habit.completed_today),
+                (expected.current_streak, expected.longest_streak, expected.completed_today),
+                habit.name,
+            )
+
+    def test_with_streaks(self):
+        histories = {
+            'none': [],
+            'today': [0],
+            'yesterday': [1, 2, 3, 5],
+            'gap': [2, 3, 4, 9, 10],
+            'long': [0, 1, 2, 3, 6, 7, 8, 9, 10, 12, 13, 18],
+            'before created': [30, 31],
+        }
+        for is_bad in (False, True):
+            for name, days in histories.items():
+                habit = models.Habit.objects.create(
+                    user=self.user,
+                    name=f'{name} {is_bad}',
+                    is_bad=is_bad,
+                )
+                habit.date_created = get_day(20)
+                habit.save()
+                for day in days:
+                    models.Completion.objects.create(habit=habit, date=get_day(day))
+        self.assertStreaksMatch()
+
+    def test_with_streaks_single_query(self):
+        models.Habit.objects.create(user=self.user, name='Habit')
+        with self.assertNumQueries(1):
+            [habit.streak_text() for habit in models.Habit.objects.with_streaks()]
+
+
+@override_settings(HABITS_LIST_PAGE_SIZE=3)
+class HabitListPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user@test.com')
+        self.client.force_login(self.user)
+        self.create_habits(['Read', 'Bake', 'Walk', 'Cook'], ['Smoke', 'Snack', 'Doomscroll'])
+
+    def create_habits(self, good, bad):
+        for name in good:
+            models.Habit.objects.create(user=self.user, name=name).complete(get_day(1))
+        for name in bad:
+            models.Habit.objects.create(user=self.user, name=name, is_bad=True)
+
+    def test_pages(self):
+        response = self.client.get(reverse('habit_list'), {'date': get_day(1)})
+        self.assertEqual([habit.name for habit in response.context['habits']], ['Bake', 'Cook', 'Read'])
+        self.assertContains(response, 'Good Habits', count=1)
+        self.assertNotContains(response, 'Bad Habits')
+        names = []
+        headings = 0
+        url = response.context['next_url']
+        while url:
+            self.assertIn(f'date={get_day(1)}', url)
+            response = self.client.get(url)
+            self.assertTemplateUsed(response, 'habits/partials/_habit_page.html')
+            self.assertTemplateNotUsed(response, 'habits/habit_list.html')
+            names += [habit.name for habit in response.context['habits']]
+            headings += response.content.decode().count('Bad Habits')
+            url = response.context.get('next_url')
+        self.assertEqual(names, ['Walk', 'Doomscroll', 'Smoke', 'Snack'])
+        self.assertEqual(headings, 1)
+
+    def test_first_page_queries_are_constant(self):
+        self.client.get(reverse('habit_list'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('habit_list'))
+        expected = len(queries)
+        self.create_habits([f'Good {i}' for i in range(20)], [f'Bad {i}' for i in range(20)])
+        self.client.get(reverse('habit_list'))
+        with self.assertNumQueries(expected):
+            response = self.client.get(reverse('habit_list'))
+        self.assertEqual(len(response.context['habits']), 3)
+
+    @override_settings(HABITS_LIST_PAGE_SIZE=30)
+    def test_unsummarized_bad_habits_queries_are_constant(self):
+        user = User.objects.create(email='other@test.com')
+        self.client.force_login(user)
+
+        def first_list():
+            models.HabitSummary.objects.all().delete()
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('habit_list'))
+            return len(queries), response
+
+        models.Habit.objects.create(user=user, name='Vape', is_bad=True)
+        expected, _ = first_list()
+        for i in range(10):
+            models.Habit.objects.create(user=user, name=f'Bad {i}', is_bad=True)
+        count, response = first_list()
+        self.assertEqual(count, expected)
+        self.assertEqual(len(response.context['habits']), 11)
+        self.assertFalse(models.HabitSummary.objects.filter(habit__user=user).exists())
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('habit_list'), {'after': 'x'}).status_code, 404)
+
+
+class RowCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        for days in [1, 2]:
+            self.habit.complete(get_day(days))
+        self.client.force_login(self.user)
+
+    def get_list(self):
+        return self.client.get(reverse('habit_list'))
+
+    def test_rows_are_cached(self):
+        first = self.get_list()
+        self.assertEqual(fragments.counters(), {'hits': 0, 'misses': 1})
+        second = self.get_list()
+        self.assertEqual(fragments.counters(), {'hits': 1, 'misses': 1})
+        self.assertEqual(
+            first.context['object_list'][0].rendered_row,
+            second.context['object_list'][0].rendered_row,
+        )
+
+    def test_toggle_invalidates_row(self):
+        self.get_list()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('toggle_completion', args=[self.habit.pk, get_day(0)]))
+        response = self.get_list()
+        self.assertEqual(fragments.counters(), {'hits': 0, 'misses': 2})
+        self.assertContains(response, '3 days and counting!')
+
+    def test_edit_invalidates_row(self):
+        self.get_list()
+        self.habit.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.habit.save()
+        self.assertContains(self.get_list(), 'Renamed')
+
+    def test_version_bumped_on_commit(self):
+        version = fragments.get_versions([self.habit.pk])[self.habit.pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.habit.toggle_completion(get_day(0))
+                # Until the toggle commits, readers keep using the old rows.
+                self.assertEqual(fragments.get_versions([self.habit.pk])[self.habit.pk], version)
+        self.assertNotEqual(fragments.get_versions([self.habit.pk])[self.habit.pk], version)
+
+    def test_rows_vary_by_date(self):
+        self.get_list()
+        self.client.get(reverse('habit_list'), {'date': get_day(1)})
+        self.assertEqual(fragments.counters(), {'hits': 0, 'misses': 2})
+
+
+class BenchmarkTestCase(TestCase):
+    def test_bench_habits(self):
+        out = StringIO()
+        call_command(
+            'bench_habits', users=2, habits=3, years=1, repeat=1, stdout=out,
+        )
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(results['Habit.stats']['samples'], 6)
+        self.assertEqual(results['with_completion_status']['samples'], 2)
+        self.assertEqual(results['with_completion_status']['queries_per_call'], 2)
+        self.assertFalse(models.Habit.objects.exists())
+
+    def test_bench_streaks(self):
+        out = StringIO()
+        call_command('bench_streaks', habits=8, years=1, repeat=1, stdout=out)
+        self.assertIn('engine only:', out.getvalue())
+        self.assertFalse(models.Habit.objects.exists())
+
+    def test_legacy_streaks_agree(self):
+        # The baseline bench_streaks times must compute the same streaks.
+        user, = benchmarks.seed(habits=8, years=1, density=0.6)
+        today = get_day(0)
+        for habit in models.Habit.objects.filter(user=user).load_stats():
+            dates = sorted(habit.completion_days(), reverse=True)
+            legacy = bench_streaks.legacy_stats(
+                [datetime.fromordinal(day).date() for day in dates],
+                habit.date_created,
+                habit.is_bad,
+                today,
+            )
+            self.assertEqual(legacy['current_streak'], habit.stats['current_streak'])
+            self.assertEqual(max(legacy['loss_streaks'] or [0]), max(habit.stats['loss_streaks'] or [0]))
+            self.assertEqual(max(legacy['win_streaks'] or [0]), max(habit.stats['win_streaks'] or [0]))
+
+
+class LoadTestCase(TransactionTestCase):
+    # The simulated users run in threads with their own connections, which
+    # only see committed data.
+    def test_bench_load(self):
+        # SQLite's in-memory test database locks whole tables between
+        # connections, so concurrent writers fail there.
+        users = 2 if connection.vendor == 'postgresql' else 1
+        out = StringIO()
+        call_command(
+            'bench_load', users=users, iterations=5, habits=3, years=1, stdout=out,
+        )
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(results['requests'], users * (5 * 5 + 1))
+        self.assertEqual(results['errors'], 0)
+        self.assertEqual(
+            list(results['by_url']),
+            ['habit_create', 'habit_detail', 'habit_list', 'toggle_completion'],
+        )
+        self.assertEqual(results['by_url']['habit_list']['samples'], users * 10)
+        self.assertGreater(results['by_url']['toggle_completion']['queries_per_request'], 0)
+        self.assertFalse(models.Habit.objects.exists())
+
+
+class ServerTimingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        models.Habit.objects.create(user=self.user, name='Habit')
+        self.client.force_login(self.user)
+
+    def test_timed_view(self):
+        with self.assertLogs('habits.timing') as logs:
+            response = self.client.get(reverse('habit_list'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, view;dur=[\d.]+$')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'habit_list')
+        self.assertEqual(line['status'], 200)
+        self.assertIn(f'desc="{line["queries"]} queries"', header)
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['render_ms'] + line['view_ms'], 0)
+
+    def test_untimed_view(self):
+        response = self.client.get(reverse('admin:login'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class StartupTestCase(TestCase):
+    def test_warmup(self):
+        with self.assertLogs('habits.startup', 'INFO') as logs:
+            timings = startup.warmup()
+        self.assertEqual(list(timings), ['urlconf', 'templates', 'database'])
+        self.assertGreater(json.loads(logs.records[-1].getMessage())['templates'], 5)
+
+    def test_connect(self):
+        # Without a pool, only connections that outlive a request are worth opening.
+        with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=0):
+            self.assertEqual(startup.connect(), [] if getattr(connection, 'pool', None) is None else ['default'])
+        with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=600):
+            self.assertEqual(startup.connect(), ['default'])
+
+    def test_imports_by_app(self):
+        importtime = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:      1500 |       2500 | habits.models',
+            'import time:      1000 |       1000 |   habits.streaks',
+            'import time:       500 |        500 | psycopg.errors',
+        ])
+        self.assertEqual(
+            startup_report.Command().imports_by_app(importtime),
+            {'habits': 2.5, 'psycopg': 0.5},
+        )
+
+
+class AssetsTestCase(TestCase):
+    def test_build(self):
+        with tempfile.TemporaryDirectory() as directory:
+            vendor_dir, output_dir = Path(directory, 'vendor'), Path(directory, 'out')
+            vendor_dir.mkdir()
+            (vendor_dir / 'a.js').write_bytes(b'var a = 1\n//# sourceMappingURL=a.js.map')
+            (vendor_dir / 'b.js').write_bytes(b'var b = 2;\n')
+            (vendor_dir / 'a.css').write_bytes(b'a{}\n/*# sourceMappingURL=a.css.map */')
+            checksums = {
+                path.name: hashlib.sha256(path.read_bytes()).hexdigest()
+                for path in vendor_dir.iterdir()
+            }
+            sizes = assets.build(vendor_dir, output_dir, {
+                'bundle.js': ['a.js', 'b.js'],
+                'bundle.css': ['a.css'],
+            }, checksums)
+            self.assertEqual((output_dir / 'bundle.js').read_bytes(), b'var a = 1\n;\nvar b = 2;\n')
+            self.assertEqual((output_dir / 'bundle.css').read_bytes(), b'a{}\n')
+            self.assertEqual(sizes['bundle.js'], 23)
+            with self.assertRaises(FileNotFoundError):
+                assets.build(vendor_dir, output_dir, {'bundle.js': ['c.js']}, checksums)
+            (vendor_dir / 'b.js').write_bytes(b'alert(1);\n')
+            with self.assertRaisesMessage(ValueError, 'b.js has sha256'):
+                assets.build(vendor_dir, output_dir, {'bundle.js': ['b.js']}, checksums)
+
+    def test_fetch_checks_pins(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = Path(directory, 'source.js')
+            source.write_bytes(b'var a = 1;\n')
+            vendor_dir = Path(directory, 'vendor')
+            sources = {'a.js': source.as_uri()}
+            with self.assertRaisesMessage(ValueError, 'No checksum is pinned for a.js.'):
+                assets.fetch(vendor_dir, sources, {})
+            checksums = assets.pin(vendor_dir, sources, Path(directory, 'checksums.json'))
+            self.assertEqual(assets.load_checksums(Path(directory, 'checksums.json')), checksums)
+            (vendor_dir / 'a.js').unlink()
+            source.write_bytes(b'alert(1);\n')
+            with self.assertRaisesMessage(ValueError, 'a.js has sha256'):
+                assets.fetch(vendor_dir, sources, checksums)
+            self.assertFalse((vendor_dir / 'a.js').exists())
+
+    def test_unused_assets(self):
+        user = User.objects.create(email='user@test.com')
+        self.client.force_login(user)
+        response = self.client.get(reverse('habit_list'))
+        self.assertNotContains(response, 'air-datepicker')
+        # Until the vendored files are committed, bundle.* may not exist.
+        self.assertNotContains(response, 'habits/bundle.')
+
+    def test_manifest(self):
+        # Live settings fail on static files missing from the manifest.
+        with tempfile.TemporaryDirectory() as directory:
+            storages = {
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+            }
+            with self.settings(STATIC_ROOT=directory, STORAGES=storages):
+                call_command('collectstatic', interactive=False, verbosity=0)
+                user = User.objects.create(email='user@test.com')
+                self.client.force_login(user)
+                self.assertEqual(self.client.get(reverse('habit_list')).status_code, 200)
+
+
+class DatabaseStatsTestCase(TestCase):
+    def test_stats(self):
+        user = User.objects.create(email='user@test.com')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('db_stats')).status_code, 403)
+        user.is_staff = True
+        user.save()
+        data = self.client.get(reverse('db_stats')).json()
+        self.assertEqual(data['mode'], 'per-request')
+        self.assertGreaterEqual(data['connects'], 1)
+
+
+class ProfilerTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = self.settings(HABITS_PROFILE_DIR=directory.name, HABITS_PROFILE_KEEP=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create(email='user@test.com')
+        models.Habit.objects.create(user=self.user, name='Habit')
+        self.client.force_login(self.user)
+
+    def test_off_without_directory(self):
+        with self.settings(HABITS_PROFILE_DIR=''):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.ProfilerMiddleware(lambda request: None)
+
+    def test_staff_only(self):
+        response = self.client.get(reverse('habit_list'), {'profile': ''})
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 302)
+
+    def test_profile(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertNotIn('X-Profile', self.client.get(reverse('habit_list')))
+        name = self.client.get(reverse('habit_list'), {'profile': ''})['X-Profile']
+        self.client.get(reverse('habit_week'), headers={'X-Profile': '1'})
+        self.client.get(reverse('habit_week'), headers={'X-Profile': '1'})
+        names = [profile['name'] for profile in profiling.recent()]
+        self.assertEqual(len(names), 2)
+        self.assertNotIn(name, names)
+
+        response = self.client.get(reverse('profile_list'))
+        self.assertContains(response, '/week/', count=2)
+        response = self.client.get(
+            reverse('profile_detail', args=[names[0]]), {'sort': 'tottime', 'match': 'habits/'},
+        )
+        profile = response.context['profile']
+        self.assertIn('habits_habit', ' '.join(query['sql'] for query in profile['queries']))
+        self.assertIn('calendars.py', profile['stats'])
+        self.assertNotIn('django/template', profile['stats'])
+        self.assertEqual(self.client.get(reverse('profile_detail', args=['missing'])).status_code, 404)
+
+    async def test_async(self):
+        self.user.is_staff = True
+        await self.user.asave()
+        middleware = profiling.ProfilerMiddleware(views.AsyncHabitListView.as_view())
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = AsyncRequestFactory().get('/', {'profile': ''})
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        response = await middleware(request)
+        await sync_to_async(response.render)()
+        record = await sync_to_async(profiling.load)(response['X-Profile'])
+        self.assertEqual(record['user'], str(self.user))
+        self.assertIn('habits_habit', ' '.join(query['sql'] for query in record['queries']))
+
+
+class AdminTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com', is_staff=True, is_superuser=True)
+        self.other = User.objects.create(email='other@test.com')
+        self.client.force_login(self.user)
+
+    def create_habits(self, user, count):
+        for i in range(count):
+            habit = models.Habit.objects.create(user=user, name=f'{user.email} {i}')
+            for days in [2, 1]:
+                habit.complete(get_day(days))
+
+    def changelist_queries(self, model, **params):
+        url = reverse(f'admin:habits_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_habit_changelist(self):
+        self.create_habits(self.user, 2)
+        models.HabitSummary.objects.all().delete()
+        self.changelist_queries('habit')
+        _, expected = self.changelist_queries('habit')
+        self.create_habits(self.other, 4)
+        response, queries = self.changelist_queries('habit')
+        self.assertEqual(queries, expected)
+        self.assertContains(response, f'?habit={self.user.habit_set.first().pk}">2</a>')
+        self.assertEqual(response.context['cl'].result_list[0].current_streak, 2)
+        response, _ = self.changelist_queries('habit', user=self.other.pk)
+        self.assertEqual(response.context['cl'].result_count, 4)
+        # Missing summaries are computed for display, not saved from a GET.
+        self.assertFalse(models.HabitSummary.objects.filter(habit__user=self.user).exists())
+
+    def test_completion_edits_refresh_habits(self):
+        cache.clear()
+        self.create_habits(self.user, 2)
+        habit, other = self.user.habit_set.order_by('pk')
+        version = fragments.get_versions([habit.pk])[habit.pk]
+
+        def post(url, data):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url, data)
+
+        def current_streak(habit):
+            return models.Habit.objects.with_summary().get(pk=habit.pk).summary.current_streak
+
+        post(reverse('admin:habits_completion_add'), {'habit': habit.pk, 'date': get_day(0)})
+        self.assertEqual(current_streak(habit), 3)
+        self.assertNotEqual(fragments.get_versions([habit.pk])[habit.pk], version)
+        completion = habit.completion_set.get(date=get_day(0))
+        post(
+            reverse('admin:habits_completion_change', args=[completion.pk]),
+            {'habit': other.pk, 'date': get_day(0)},
+        )
+        self.assertEqual((current_streak(habit), current_streak(other)), (2, 3))
+        completion = habit.completion_set.get(date=get_day(1))
+        post(reverse('admin:habits_completion_delete', args=[completion.pk]), {'post': 'yes'})
+        self.assertEqual(current_streak(habit), 0)
+        post(reverse('admin:habits_completion_changelist'), {
+            'action': 'delete_selected',
+            'select_across': 0,
+            '_selected_action': list(other.completion_set.values_list('pk', flat=True)),
+            'post': 'yes',
+        })
+        self.assertEqual(current_streak(other), 0)
+
+    def test_completion_changelist(self):
+        self.create_habits(self.user, 1)
+        _, expected = self.changelist_queries('completion')
+        self.create_habits(self.other, 3)
+        response, queries = self.changelist_queries('completion')
+        self.assertEqual(queries, expected)
+        self.assertEqual(response.context['cl'].result_count, 8)
+        habit = self.other.habit_set.first()
+        response, _ = self.changelist_queries('completion', user=self.other.pk)
+        self.assertEqual(response.context['cl'].result_count, 6)
+        response, _ = self.changelist_queries('completion', habit=habit.pk)
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertContains(response, habit.name)
+
+    def test_estimated_count(self):
+        self.create_habits(self.user, 2)
+        if connection.vendor != 'postgresql':
+            self.assertIsNone(admin.estimated_count(models.Completion, 'default'))
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {models.Completion._meta.db_table}')
+        self.assertEqual(admin.estimated_count(models.Completion, 'default'), 4)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        models.Habit.objects.create(user=self.user, name='Empty', is_bad=True)
+        for days in [3, 2, 1]:
+            self.habit.complete(get_day(days))
+        self.client.force_login(self.user)
+
+    def test_csv(self):
+        response = self.client.get(reverse('export', args=['csv']))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(exports.FIELDS))
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[1].startswith(f'{self.habit.pk},Habit,False,'))
+        self.assertTrue(lines[1].endswith(f',3,3,3,3,3,{get_day(3)}'))
+        self.assertTrue(lines[4].endswith(','))
+        self.assertFalse(models.HabitSummary.objects.filter(habit__name='Empty').exists())
+
+    def test_jsonl(self):
+        out = StringIO()
+        call_command('export_habits', 'user@test.com', format='jsonl', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(
+            [row['date'] for row in rows],
+            [str(get_day(days)) for days in [3, 2, 1]] + [None],
+        )
+        self.assertEqual(rows[0]['current_streak'], 3)
+        self.assertEqual(rows[3]['habit'], 'Empty')
+
+    def test_bitmap_storage(self):
+        expected = b''.join(self.client.get(reverse('export', args=['jsonl'])).streaming_content)
+        call_command('convert_completions', 'bitmap', stdout=StringIO())
+        with self.settings(HABITS_COMPLETION_STORAGE='bitmap'):
+            response = self.client.get(reverse('export', args=['jsonl']))
+            self.assertEqual(b''.join(response.streaming_content), expected)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse('export', args=['xml'])).status_code, 404)
+
+
+class YearCalendarTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        self.today = get_day(0)
+        self.habit.complete(self.today)
+        self.habit.complete(self.today.replace(month=1, day=1))
+        self.client.force_login(self.user)
+
+    def get(self, year=None):
+        return self.client.get(
+            reverse('habit_year', args=[self.habit.pk, self.today.year if year is None else year])
+        )
+
+    def test_calendar(self):
+        response = self.get()
+        self.assertContains(response, 'class="completed"', count=2)
+        self.assertContains(response, f'title="{self.today:%b} {self.today.day}, ')
+        self.assertNotContains(response, '>>')
+        self.assertEqual(
+            self.get(self.today.year - 1).context['next_year'], self.today.year
+        )
+        self.assertEqual(self.get(self.today.year + 1).status_code, 404)
+
+    def test_first_year(self):
+        self.assertNotIn('prev_year', self.get().context)
+        self.assertNotContains(self.get(), '<<')
+        self.habit.complete(self.today.replace(year=self.today.year - 2, day=1))
+        self.assertEqual(self.get().context['prev_year'], self.today.year - 1)
+        self.assertNotIn('prev_year', self.get(self.today.year - 2).context)
+        for year in [0, 1]:
+            self.assertEqual(self.get(year).status_code, 404)
+        self.assertEqual(self.get(2).status_code, 200)
+
+    def test_calendar_is_cached(self):
+        self.get()
+        with CaptureQueriesContext(connection) as queries:
+            self.get()
+        self.assertFalse(
+            any('habits_completion' in query['sql'] for query in queries)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.habit.complete(self.today - timedelta(days=1))
+        self.assertContains(self.get(), 'class="completed"', count=3)
+
+    def test_bitmap_storage(self):
+        expected = self.get().content
+        call_command('convert_completions', 'bitmap', stdout=StringIO())
+        cache.clear()
+        with self.settings(HABITS_COMPLETION_STORAGE='bitmap'):
+            self.assertEqual(self.get().content, expected)
+
+
+class WeekGridTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        self.habit.complete(get_day(0))
+        self.habit.complete(get_day(6))
+        self.habit.complete(get_day(7))
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        return self.client.get(reverse('habit_week'), params)
+
+    def test_grid(self):
+        response = self.get()
+        row, = response.context['week']['rows']
+        self.assertEqual(
+            [cell['completed'] for cell in row['cells']],
+            [True, False, False, False, False, False, True],
+        )
+        self.assertContains(response, ' checked', count=2)
+        self.assertNotIn('next_date', response.context)
+        self.assertEqual(self.get(date=get_day(7)).context['next_date'], get_day(0))
+        self.assertEqual(self.get(date=get_day(-1)).status_code, 404)
+
+    def test_queries_are_constant(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get()
+        expected = len(queries)
+        for i in range(20):
+            models.Habit.objects.create(user=self.user, name=f'Habit {i}').complete(get_day(1))
+        with self.assertNumQueries(expected):
+            response = self.get()
+        self.assertEqual(len(response.context['week']['rows']), 21)
+
+    def test_toggle_cell(self):
+        url = reverse('toggle_completion', args=[self.habit.pk, get_day(1)])
+        response = self.client.post(f'{url}?cell')
+        self.assertTemplateUsed(response, 'habits/partials/_week_cell.html')
+        self.assertContains(response, ' checked')
+        self.assertContains(response, f'{url}?cell')
+        self.assertNotContains(self.client.post(f'{url}?cell'), ' checked')
+
+    def test_compacted_years(self):
+        end = datetime(models.open_year() - 1, 1, 3).date()
+        self.habit.complete(end)
+        self.habit.complete(datetime(end.year - 1, 12, 30).date())
+        models.Completion.objects.compact([self.habit.pk])
+        response = self.get(date=end)
+        row, = response.context['week']['rows']
+        self.assertEqual(
+            [cell['date'] for cell in row['cells'] if cell['completed']],
+            [datetime(end.year - 1, 12, 30).date(), end],
+        )
+
+
+class ImportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        self.habit.complete(get_day(2))
+        User.objects.create(email='other@test.com').habit_set.create(name='Taken')
+
+    def import_lines(self, lines, format='csv', **kwargs):
+        return imports.import_completions(self.user, lines, format, **kwargs)
+
+    def test_import(self):
+        report = self.import_lines([
+            'habit,date,is_bad\n',
+            f'Habit,{get_day(1)},\n',
+            f'Habit,{get_day(2)},\n',
+            f'Habit,{get_day(1)},\n',
+            f'Smoking,{get_day(10)},True\n',
+            f'Habit,{get_day(-1)},\n',
+            'Habit,2024-02-30,\n',
+            'Habit,yesterday,\n',
+            f'Taken,{get_day(1)},\n',
+            'Running,,\n',
+        ], batch_size=2)
+        self.assertEqual(report['rows'], 9)
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['duplicates'], 2)
+        self.assertEqual(report['invalid'], 4)
+        self.assertEqual(report['habits'], 3)
+        self.assertEqual([line for line, _ in report['errors']], [6, 7, 8, 9])
+        self.assertTrue(models.Habit.objects.get(name='Smoking').is_bad)
+        self.assertTrue(models.Habit.objects.filter(name='Running').exists())
+        habit = models.Habit.objects.with_summary().get(pk=self.habit.pk)
+        self.assertEqual(habit.summary.current_streak, 2)
+
+    def test_import_bitmap(self):
+        call_command('convert_completions', 'bitmap', stdout=StringIO())
+        with self.settings(HABITS_COMPLETION_STORAGE='bitmap'):
+            report = self.import_lines([
+                json.dumps({'habit': 'Habit', 'date': str(get_day(days))}) + '\n'
+                for days in [1, 2, 400]
+            ] + ['not json\n'], format='jsonl')
+            self.assertEqual(report['imported'], 2)
+            self.assertEqual(report['duplicates'], 1)
+            self.assertEqual(report['errors'], [(4, 'Not a JSON object.')])
+            self.assertEqual(models.Habit.objects.get(pk=self.habit.pk).current_streak, 2)
+
+    def test_invalid_jsonl_names(self):
+        report = self.import_lines([
+            json.dumps({'habit': name, 'date': str(get_day(1))}) + '\n'
+            for name in [7, ['Habit'], {'name': 'Habit'}, None, 'Habit']
+        ], format='jsonl')
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['invalid'], 4)
+        self.assertEqual(report['errors'][0], (1, 'Invalid habit name 7.'))
+        self.assertEqual(report['errors'][3], (4, 'Missing habit name.'))
+
+    def test_export_round_trip(self):
+        self.client.force_login(self.user)
+        self.habit.complete(get_day(1))
+        export = b''.join(self.client.get(reverse('export', args=['csv'])).streaming_content)
+        models.Completion.objects.all().delete()
+        upload = SimpleUploadedFile('habits.csv', export)
+        response = self.client.post(reverse('import'), {'file': upload, 'format': 'csv'})
+        self.assertEqual(response.context['report']['imported'], 2)
+        self.assertEqual(models.Completion.objects.count(), 2)
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.habits = [
+            models.Habit.objects.create(user=self.user, name=f'Habit {i}')
+            for i in range(3)
+        ]
+        for days in [2, 1, 0]:
+            self.habits[0].complete(get_day(days))
+        self.client.force_login(self.user)
+
+    def get(self, url=None, **params):
+        return self.client.get(url or reverse('api_habit_list'), params)
+
+    def test_list(self):
+        response = self.get()
+        self.assertEqual(response.json()['next'], None)
+        habit = response.json()['results'][0]
+        self.assertEqual(list(habit), api.FIELDS)
+        self.assertEqual(habit['current_streak'], 3)
+        self.assertEqual(habit['longest_streak'], 3)
+        self.assertTrue(habit['completed_today'])
+        self.assertEqual(habit['week_completions'], 2)
+        self.assertEqual(habit['year_completions'], 2)
+
+    def test_keyset_pagination(self):
+        response = self.get(limit=2, fields='name')
+        self.assertEqual(response.json()['results'], [{'name': 'Habit 0'}, {'name': 'Habit 1'}])
+        response = self.get(response.json()['next'])
+        self.assertEqual(response.json(), {'results': [{'name': 'Habit 2'}], 'next': None})
+
+    def test_sparse_fields_skip_stats(self):
+        with self.assertNumQueries(4):
+            # Session, user, validators and habits.
+            response = self.get(fields='id,name')
+        self.assertEqual(response.json()['results'][0], {'id': self.habits[0].pk, 'name': 'Habit 0'})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get(fields='name,secret').status_code, 400)
+        self.assertEqual(self.get(limit=0).status_code, 400)
+        self.assertEqual(self.get(after='x').status_code, 400)
+
+    def test_detail(self):
+        url = reverse('api_habit_detail', args=[self.habits[0].pk])
+        self.assertEqual(self.get(url, fields='current_streak').json(), {'current_streak': 3})
+        url = reverse('api_habit_detail', args=[self.habits[0].pk + 100])
+        self.assertEqual(self.get(url).status_code, 404)
+
+    def test_conditional_get(self):
+        first = self.get()
+        # Habits without a summary are summarized without saving one.
+        self.assertNotIn('ETag', first)
+        self.assertEqual(models.HabitSummary.objects.count(), 1)
+        call_command('rebuild_habit_summaries', stdout=StringIO())
+        second = self.get()
+        etag = second['ETag']
+        response = self.client.get(reverse('api_habit_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            reverse('api_habit_list'),
+            HTTP_IF_MODIFIED_SINCE=second['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+        self.habits[0].uncomplete(get_day(0))
+        response = self.client.get(reverse('api_habit_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['current_streak'], 2)
+        self.assertNotEqual(first.content, response.content)
+
+    def test_conditional_get_after_edit(self):
+        call_command('rebuild_habit_summaries', stdout=StringIO())
+        etag = self.get()['ETag']
+        habit = models.Habit.objects.get(pk=self.habits[0].pk)
+        with self.assertNumQueries(1):
+            habit.save()
+        response = self.client.get(reverse('api_habit_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        habit.name = 'Renamed'
+        habit.save(update_fields=['is_bad'])
+        response = self.client.get(reverse('api_habit_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(2):
+            habit.save()
+        response = self.client.get(reverse('api_habit_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed', [habit['name'] for habit in response.json()['results']])
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.get().status_code, 403)
+
+
+class SyncAPITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.habits = [
+            models.Habit.objects.create(user=self.user, name=f'Habit {i}')
+            for i in range(20)
+        ]
+        self.habits[0].complete(get_day(10))
+        self.client.force_login(self.user)
+
+    def sync(self, operations):
+        return self.client.post(
+            reverse('api_sync'),
+            json.dumps({'operations': operations}),
+            content_type='application/json',
+        )
+
+    def week(self):
+        return [
+            {'habit': habit.pk, 'date': str(get_day(days)), 'completed': True}
+            for habit in self.habits
+            for days in range(7)
+        ] + [
+            {'habit': self.habits[0].pk, 'date': str(get_day(3)), 'completed': False},
+            {'habit': self.habits[0].pk, 'date': str(get_day(10)), 'completed': False},
+        ]
+
+    def test_sync(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.sync(self.week())
+        self.assertLessEqual(len(queries), 11)
+        habits = response.json()['habits']
+        self.assertEqual(len(habits), 20)
+        self.assertEqual(habits[0]['current_streak'], 3)
+        self.assertEqual(habits[0]['completions'][str(get_day(3))], False)
+        self.assertEqual(habits[1]['current_streak'], 7)
+        self.assertEqual(models.Completion.objects.count(), 20 * 7 - 1)
+        self.assertEqual(self.sync(self.week()).json(), response.json())
+        self.assertEqual(models.Completion.objects.count(), 20 * 7 - 1)
+
+    def test_sync_bitmap(self):
+        call_command('convert_completions', 'bitmap', stdout=StringIO())
+        with self.settings(HABITS_COMPLETION_STORAGE='bitmap'):
+            response = self.sync(self.week())
+            self.assertEqual(self.sync(self.week()).json(), response.json())
+            habit = models.Habit.objects.get(pk=self.habits[0].pk)
+            self.assertEqual(len(habit.completion_days()), 6)
+            self.assertEqual(habit.current_streak, 3)
+
+    def test_invalid(self):
+        other = User.objects.create(email='other@test.com').habit_set.create(name='Other')
+        operation = {'habit': other.pk, 'date': str(get_day(0)), 'completed': True}
+        self.assertEqual(self.sync([operation]).status_code, 400)
+        operation = {'habit': self.habits[0].pk, 'date': 'today', 'completed': True}
+        self.assertEqual(self.sync([operation]).status_code, 400)
+        operation = {'habit': self.habits[0].pk, 'date': str(get_day(-1)), 'completed': True}
+        response = self.sync([operation])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('future', response.json()['error'])
+        self.assertFalse(models.Completion.objects.filter(date__gt=get_day(0)).exists())
+        self.assertEqual(self.client.post(reverse('api_sync'), 'nope', content_type='application/json').status_code, 400)
+        self.assertFalse(models.Completion.objects.filter(habit=other).exists())
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com')
+        self.habit = models.Habit.objects.create(user=self.user, name='Habit')
+        self.habit.complete(get_day(1))
+        self.factory = AsyncRequestFactory()
+
+    def request(self, method, path, user=None):
+        request = getattr(self.factory, method)(path)
+        user = user or self.user
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    async def render(self, view, request, **kwargs):
+        response = await view.as_view()(request, **kwargs)
+        if hasattr(response, 'render'):
+            await sync_to_async(response.render)()
+        return response
+
+    async def test_list(self):
+        response = await self.render(views.AsyncHabitListView, self.request('get', '/'))
+        self.assertContains(response, '⏳ 1 day streak on the line!')
+
+    async def test_detail(self):
+        response = await self.render(
+            views.AsyncHabitDetailView,
+            self.request('get', '/'),
+            pk=self.habit.pk,
+        )
+        self.assertContains(response, '<h2>Habit</h2>')
+
+    async def test_toggle(self):
+        response = await self.render(
+            views.AsyncToggleCompletionView,
+            self.request('post', '/'),
+            pk=self.habit.pk,
+            date=get_day(0),
+        )
+        self.assertContains(response, '🎉 2 days and counting!')
+        self.assertEqual(await models.Completion.objects.acount(), 2)
+
+    async def test_login_required(self):
+        response = await self.render(
+            views.AsyncHabitListView,
+            self.request('get', '/', user=AnonymousUser()),
+        )
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,131 @@
+"""
+Per-request timing of database queries and template rendering.
+
+ServerTimingMiddleware records the query count, database time, template
+render time and total view time of every request, and for the views named in
+HABITS_SERVER_TIMING_URLS reports them in a Server-Timing header and a JSON
+log line on the ``habits.timing`` logger. Queries are timed by a database
+execute wrapper that HabitsConfig installs on every connection and templates
+by the DjangoTemplates backend below, so nothing depends on DEBUG. The
+middleware runs in both sync and async request paths.
+"""
+
+import contextvars
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('habits_timings', default=None)
+
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.rendering = False
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - started
+
+
+def install(sender, connection, **kwargs):
+    """
+    Add record_query to every new database connection. The timings of the
+    current request are found through a context variable, which also reaches
+    the threads that run the ORM for async views.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, timings)
+
+    def report(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        match = request.resolver_match
+        if match and match.url_name in settings.HABITS_SERVER_TIMING_URLS:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+                f'render;dur={timings.render * 1000:.1f}',
+                f'view;dur={total * 1000:.1f}',
+            ])
+            logger.info(json.dumps({
+                'view': match.url_name,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timings.queries,
+                'db_ms': round(timings.db * 1000, 1),
+                'render_ms': round(timings.render * 1000, 1),
+                'view_ms': round(total * 1000, 1),
+            }))
+        return response
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        # Templates rendered while rendering another are already counted.
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.render += time.perf_counter() - started
+            timings.rendering = False
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing every render for the middleware."""
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
@@ -4,12 +4,21 @@ from django.contrib import admin
 from django.urls import include, path, re_path, register_converter
 from django.views.generic import TemplateView
 
-from . import views
+from . import api, views
 from .converters import DateConverter
 
 
 register_converter(DateConverter, 'date')
 
+if settings.HABITS_ASYNC_VIEWS:
+    list_view = views.AsyncHabitListView
+    detail_view = views.AsyncHabitDetailView
+    toggle_view = views.AsyncToggleCompletionView
+else:
+    list_view = views.HabitListView
+    detail_view = views.HabitDetailView
+    toggle_view = views.ToggleCompletionView
+
 urlpatterns = [
     path(
         'robots.txt',
@@ -18,15 +27,45 @@ urlpatterns = [
             content_type='text/plain',
         ),
     ),
+    path(
+        'admin/profiles/',
+        admin.site.admin_view(views.ProfileListView.as_view()),
+        name='profile_list',
+    ),
+    path(
+        'admin/profiles/<slug:name>/',
+        admin.site.admin_view(views.ProfileDetailView.as_view()),
+        name='profile_detail',
+    ),
     path('admin/', admin.site.urls),
-    path('', views.HabitListView.as_view(), name='habit_list'),
-    path('<int:pk>/', views.HabitDetailView.as_view(), name='habit_detail'),
+    path('db/stats/', views.DatabaseStatsView.as_view(), name='db_stats'),
+    path('', list_view.as_view(), name='habit_list'),
+    path('<int:pk>/', detail_view.as_view(), name='habit_detail'),
+    path(
+        '<int:pk>/<int:year>/',
+        views.HabitYearView.as_view(),
+        name='habit_year',
+    ),
+    path('week/', views.HabitWeekView.as_view(), name='habit_week'),
     path('create/', views.HabitCreateView.as_view(), name='habit_create'),
     path(
         'complete/<int:pk>/<date:date>/',
-        views.ToggleCompletionView.as_view(),
+        toggle_view.as_view(),
         name='toggle_completion',
     ),
+    path('api/habits/', api.HabitListAPIView.as_view(), name='api_habit_list'),
+    path(
+        'api/habits/<int:pk>/',
+        api.HabitDetailAPIView.as_view(),
+        name='api_habit_detail',
+    ),
+    path('api/sync/', api.SyncAPIView.as_view(), name='api_sync'),
+    path('import/', views.ImportView.as_view(), name='import'),
+    path(
+        'export.<str:format>',
+        views.ExportView.as_view(),
+        name='export',
+    ),
 ]
 
 if settings.DEBUG:
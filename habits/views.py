@@ -1,22 +1,42 @@
+import datetime
+import io
 import urllib.parse
 
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import Http404, HttpResponse
-from django.shortcuts import get_object_or_404, render
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
 from django.template.loader import render_to_string
-from django.urls import reverse_lazy
+from django.template.response import TemplateResponse
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
-from django.views.generic import ListView, View, CreateView, DetailView
+from django.views.generic import ListView, View, CreateView, DetailView, FormView, TemplateView
 
-from .forms import DateForm, HabitForm
-from .models import Habit
+from . import calendars, exports, fragments, imports, pooling, profiling
+from .forms import DateForm, HabitForm, ImportForm
+from .models import Habit, HabitSummary, completions
 
 
 class HabitListView(LoginRequiredMixin, ListView):
+    """
+    The user's habits ordered by (is_bad, name, pk), a page at a time. The
+    first page comes with the full list page; each page ends in a loader
+    that htmx swaps for the next one, fetched with ``after`` set to the last
+    habit shown, once it scrolls into view.
+    """
+
     def setup(self, request, *args, **kwargs):
         self.date = self.get_date(request)
         if self.date > timezone.localdate():
             raise Http404
+        try:
+            self.after = int(request.GET.get('after', 0))
+        except ValueError:
+            raise Http404
         return super().setup(request, *args, **kwargs)
 
     def get_date(self, request):
@@ -26,37 +46,89 @@ class HabitListView(LoginRequiredMixin, ListView):
         else:
             return timezone.localdate()
 
+    def get_template_names(self):
+        if self.after:
+            return ['habits/partials/_habit_page.html']
+        return ['habits/habit_list.html']
+
     def get_queryset(self):
-        return Habit.objects.filter(
+        habits = Habit.objects.filter(
             user=self.request.user
-        ).with_completion_status(self.date)
+        ).order_by('is_bad', 'name', 'pk')
+        if self.after:
+            # Keyset pagination: continue after the last habit shown, whose
+            # sort key is read in the same query.
+            last = habits.filter(pk=self.after)
+            is_bad = Subquery(last.values('is_bad'))
+            name = Subquery(last.values('name'))
+            habits = habits.filter(
+                Q(is_bad__gt=is_bad)
+                | Q(is_bad=is_bad, name__gt=name)
+                | Q(is_bad=is_bad, name=name, pk__gt=self.after)
+            )
+        # One more than a page tells whether there is a next one.
+        return habits.with_completion_status(self.date)[:settings.HABITS_LIST_PAGE_SIZE + 1]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['habit_form'] = HabitForm()
+        habits = list(context['object_list'])
+        page = habits[:settings.HABITS_LIST_PAGE_SIZE]
+        # The recent window can't tell the current streak of a habit, such as
+        # a bad habit without slips, whose streak started before it; build
+        # those habits' summaries together rather than reading each history.
+        # Only writes save summaries.
+        HabitSummary.objects.build([
+            habit for habit in page
+            if not habit._loaded_summary and habit.recent_stats is None
+        ])
+        fragments.render_rows(self.request.user, page, self.date)
+        # Earlier pages head the group their next page starts.
+        previous = page[0].is_bad if self.after and page else None
+        for habit in page:
+            habit.starts_group = habit.is_bad != previous
+            previous = habit.is_bad
+        context['habits'] = page
+        if len(habits) > len(page):
+            query = {**self.request.GET.dict(), 'after': page[-1].pk}
+            context['next_url'] = f'{reverse("habit_list")}?{urllib.parse.urlencode(query)}'
+            context['next_starts_group'] = habits[-1].is_bad != page[-1].is_bad
         context['date'] = self.date
-        context['date_form'] = DateForm(initial={'date': self.date})
-        context['prev_date'] = self.date - timezone.timedelta(days=1)
-        if self.date < timezone.localdate():
-            context['next_date'] = self.date + timezone.timedelta(days=1)
+        if not self.after:
+            context['habit_form'] = HabitForm()
+            context['date_form'] = DateForm(initial={'date': self.date})
+            context['prev_date'] = self.date - timezone.timedelta(days=1)
+            if self.date < timezone.localdate():
+                context['next_date'] = self.date + timezone.timedelta(days=1)
         return context
 
 
 class ToggleCompletionView(LoginRequiredMixin, View):
     def get_habit(self):
         return get_object_or_404(
-            self.request.user.habit_set.with_completion_status(self.kwargs['date']),
+            self.request.user.habit_set.with_summary().select_for_update(
+                of=('self',),
+            ),
             pk=self.kwargs['pk'],
         )
 
+    def get_template_name(self):
+        # The week grid swaps just the toggled cell.
+        if 'cell' in self.request.GET:
+            return 'habits/partials/_week_cell.html'
+        return 'habits/partials/_habit.html'
+
+    def toggle(self, date):
+        with transaction.atomic():
+            habit = self.get_habit()
+            habit.toggle_completion(date)
+        return habit
+
     def post(self, request, pk, date):
-        habit = self.get_habit()
-        habit.toggle_completion(date)
-        habit = self.get_habit()
+        habit = self.toggle(date)
         return render(
             request,
-            'habits/partials/_habit.html',
-            {'habit': habit, 'date': date}
+            self.get_template_name(),
+            {'habit': habit, 'date': date, 'completed': habit.is_completed}
         )
 
 
@@ -92,9 +164,187 @@ class HabitCreateView(LoginRequiredMixin, CreateView):
 
 class HabitDetailView(LoginRequiredMixin, DetailView):
     def get_queryset(self):
-        return self.request.user.habit_set
+        return self.request.user.habit_set.with_summary().with_period_counts()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['stats'] = self.object.period_stats()
+        return context
+
+
+class ExportView(LoginRequiredMixin, View):
+    def get(self, request, format):
+        if format not in exports.CONTENT_TYPES:
+            raise Http404
+        return StreamingHttpResponse(
+            exports.export(request.user, format),
+            content_type=exports.CONTENT_TYPES[format],
+            headers={
+                'Content-Disposition': f'attachment; filename="habits.{format}"',
+            },
+        )
+
+
+class ImportView(LoginRequiredMixin, FormView):
+    form_class = ImportForm
+    template_name = 'habits/import.html'
+
+    def form_valid(self, form):
+        lines = io.TextIOWrapper(
+            form.cleaned_data['file'].file,
+            encoding='utf-8-sig',
+            newline='',
+        )
+        try:
+            report = imports.import_completions(
+                self.request.user,
+                lines,
+                form.cleaned_data['format'],
+            )
+        except UnicodeDecodeError:
+            form.add_error('file', 'The file must be UTF-8 encoded.')
+            return self.form_invalid(form)
+        return self.render_to_response(
+            self.get_context_data(form=ImportForm(), report=report)
+        )
+
+
+class HabitYearView(LoginRequiredMixin, DetailView):
+    template_name = 'habits/habit_year.html'
+
+    def get_queryset(self):
+        return self.request.user.habit_set.with_summary()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        year = self.kwargs['year']
+        # The calendar pads its first week with days of the year before.
+        if not datetime.MINYEAR < year <= timezone.localdate().year:
+            raise Http404
+        context['year'] = year
+        context['calendar'] = fragments.render_year(self.object, year)
+        if year > self.first_year():
+            context['prev_year'] = year - 1
+        if year < timezone.localdate().year:
+            context['next_year'] = year + 1
+        return context
+
+    def first_year(self):
+        """The year the habit was created or first completed, if earlier."""
+        first = self.object.date_created
+        summary = self.object._loaded_summary
+        if summary and summary.first_date:
+            first = min(first, summary.first_date)
+        return max(first.year, datetime.MINYEAR + 1)
+
+
+class HabitWeekView(LoginRequiredMixin, TemplateView):
+    """
+    The user's habits against the seven days up to ``date``, each cell a
+    toggle. Every habit's completions come from one date range query.
+    """
+    template_name = 'habits/habit_week.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['stats'] = self.object.stats
+        form = DateForm(self.request.GET)
+        end = form.cleaned_data['date'] if form.is_valid() else timezone.localdate()
+        if end > timezone.localdate():
+            raise Http404
+        start = end - timezone.timedelta(days=6)
+        habits = self.request.user.habit_set.order_by('is_bad', 'name', 'pk')
+        context['week'] = calendars.week_grid(
+            habits, completions().days_between(habits, start, end), end,
+        )
+        context['prev_date'] = end - timezone.timedelta(days=7)
+        if end < timezone.localdate():
+            context['next_date'] = min(
+                end + timezone.timedelta(days=7), timezone.localdate(),
+            )
+        return context
+
+
+class DatabaseStatsView(UserPassesTestMixin, View):
+    """Connection reuse statistics of the worker process serving the request."""
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return JsonResponse(pooling.stats())
+
+
+class ProfileListView(TemplateView):
+    """The latest request profiles, served by the admin site to staff."""
+    template_name = 'habits/profile_list.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(admin.site.each_context(self.request))
+        context['title'] = 'Request profiles'
+        context['profiles'] = profiling.recent()
         return context
+
+
+class ProfileDetailView(TemplateView):
+    template_name = 'habits/profile_detail.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        sort = self.request.GET.get('sort', 'cumulative')
+        if sort not in profiling.SORTS:
+            raise Http404
+        match = self.request.GET.get('match', '')
+        profile = profiling.load(self.kwargs['name'], sort, match)
+        if profile is None:
+            raise Http404
+        context.update(admin.site.each_context(self.request))
+        context['title'] = profile['path']
+        context['profile'] = profile
+        context['sort'] = sort
+        context['sorts'] = profiling.SORTS
+        context['match'] = match
+        return context
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    LoginRequiredMixin for views with async handlers. The user is loaded with
+    the async API and set on the request, so sync code reading request.user
+    afterwards doesn't query the database from the event loop.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(
+            request, *args, **kwargs,
+        )
+
+
+class AsyncHabitListView(AsyncLoginRequiredMixin, HabitListView):
+    async def get(self, request, *args, **kwargs):
+        self.object_list = [habit async for habit in self.get_queryset()]
+        # Rendering rows goes through the cache, which may be the database.
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
+
+
+class AsyncHabitDetailView(AsyncLoginRequiredMixin, HabitDetailView):
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object_or_404(self.get_queryset(), pk=kwargs['pk'])
+        # Stats may rebuild the summary or refresh its period counts.
+        context = await sync_to_async(self.get_context_data)(object=self.object)
+        return self.render_to_response(context)
+
+
+class AsyncToggleCompletionView(AsyncLoginRequiredMixin, ToggleCompletionView):
+    async def post(self, request, pk, date):
+        # The async ORM has no transactions, so the toggle runs in a thread.
+        habit = await sync_to_async(self.toggle)(date)
+        return TemplateResponse(
+            request,
+            self.get_template_name(),
+            {'habit': habit, 'date': date, 'completed': habit.is_completed},
+        )
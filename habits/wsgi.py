@@ -10,9 +10,15 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 import os
 
 import dotenv
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 dotenv.load_dotenv()
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habits.settings')
 
 application = get_wsgi_application()
+
+if settings.HABITS_WARMUP:
+    from habits import startup
+
+    startup.warmup(databases=settings.HABITS_WARMUP_DATABASES)